@@ -0,0 +1,97 @@
+"""
+Prefix autocomplete over product names and brands.
+
+Every name and brand is indexed once per word start ("The North Face"
+is reachable from "the", "north" and "face") in a sorted array, so a
+prefix lookup is a binary search followed by a short forward scan.
+Suggestions are served entirely from memory.
+"""
+import logging
+import re
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+MAX_LIMIT = 25
+
+# Matching keys examined per lookup; bounds the cost of very short prefixes
+SCAN_LIMIT = 512
+
+_WORD_START_RE = re.compile(r"(?:^|(?<=[^a-z0-9]))[a-z0-9]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(text):
+    return _SPACE_RE.sub(" ", str(text).lower()).strip()
+
+
+class AutocompleteIndex:
+    def __init__(self):
+        self.keys = []
+        self.entries = []
+        self.suggestions = []
+        self.ready = False
+
+    def build_from(self, products):
+        """Build the index from product documents"""
+        suggestions = {}
+        for product in products:
+            name = product.get("name")
+            if name:
+                suggestion = suggestions.setdefault(("product", normalize(name)), {
+                    "text": str(name), "type": "product", "product_id": product.get("product_id"), "products": 0
+                })
+                suggestion["products"] += 1
+            brand = product.get("brand")
+            if brand:
+                suggestion = suggestions.setdefault(("brand", normalize(brand)), {
+                    "text": str(brand), "type": "brand", "products": 0
+                })
+                suggestion["products"] += 1
+
+        suggestion_list = list(suggestions.values())
+        pairs = []
+        for suggestion_id, suggestion in enumerate(suggestion_list):
+            text = normalize(suggestion["text"])
+            for match in _WORD_START_RE.finditer(text):
+                pairs.append((text[match.start():], match.start() == 0, suggestion_id))
+        pairs.sort(key=lambda pair: pair[0])
+
+        # Swap everything in at once so concurrent lookups see a consistent index
+        self.keys, self.entries, self.suggestions = (
+            [key for key, _, _ in pairs],
+            [(at_start, suggestion_id) for _, at_start, suggestion_id in pairs],
+            suggestion_list,
+        )
+        self.ready = True
+        logger.info(f"Autocomplete index built: {len(suggestion_list)} suggestions, {len(pairs)} keys")
+
+    def complete(self, prefix, limit=10):
+        """Top suggestions whose name or brand has a word starting with prefix"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        best = {}
+        start = bisect_left(self.keys, prefix)
+        for i in range(start, min(start + SCAN_LIMIT, len(self.keys))):
+            if not self.keys[i].startswith(prefix):
+                break
+            at_start, suggestion_id = self.entries[i]
+            best[suggestion_id] = best.get(suggestion_id, False) or at_start
+
+        # Whole-string prefix matches first, then brands, then by product count
+        ranked = sorted(
+            best.items(),
+            key=lambda item: (
+                not item[1],
+                self.suggestions[item[0]]["type"] != "brand",
+                -self.suggestions[item[0]]["products"],
+                self.suggestions[item[0]]["text"],
+            )
+        )
+        return [dict(self.suggestions[suggestion_id]) for suggestion_id, _ in ranked[:limit]]
+
+
+# Shared instance, built in the FastAPI lifespan hook
+autocomplete_index = AutocompleteIndex()
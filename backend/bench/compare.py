@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Diff two load_test.py (or micro_benchmarks.py) result files, e.g. the
+last release against a candidate.  Prints throughput and latency
+percentiles side by side per endpoint and per chat intent (time per
+operation per code path for the micro-benchmarks), and exits non-zero
+when any p95, p99 or per-operation time got slower than --threshold
+percent.
+
+    python bench/compare.py before.json after.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+METRICS = ["throughput_rps", "p50_ms", "p95_ms", "p99_ms"]
+# Metrics that fail the comparison when they regress past the threshold
+GATED = ["p95_ms", "p99_ms"]
+
+# Result group -> (title, metrics shown, metrics gated)
+GROUPS = {
+    "endpoints": ("Per endpoint", METRICS, GATED),
+    "intents": ("Per chat intent", METRICS, GATED),
+    "paths": ("Per code path", ["us_per_op"], ["us_per_op"]),
+}
+
+
+def change(before, after):
+    return (after - before) / before * 100 if before else 0.0
+
+
+def compare_group(title, before, after, threshold, metrics=METRICS, gated=GATED):
+    regressions = []
+    print(f"\n{title}")
+    print(f"{'':<24} " + " ".join(f"{metric:>24}" for metric in metrics))
+    for name in sorted(set(before) | set(after)):
+        old, new = before.get(name, {}), after.get(name, {})
+        if not old.get("count") or not new.get("count"):
+            print(f"{name:<24} only in {'after' if new.get('count') else 'before'}")
+            continue
+        cells = []
+        for metric in metrics:
+            delta = change(old[metric], new[metric])
+            cells.append(f"{old[metric]:>8.2f} → {new[metric]:>8.2f} {delta:>+4.0f}%")
+            if metric in gated and delta > threshold:
+                regressions.append(f"{title} / {name}: {metric} {old[metric]:.2f} → {new[metric]:.2f} ({delta:+.0f}%)")
+        print(f"{name:<24} " + " ".join(f"{cell:>24}" for cell in cells))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed p95/p99 slowdown in percent")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    regressions = []
+    for group, (title, metrics, gated) in GROUPS.items():
+        if group in before or group in after:
+            regressions += compare_group(title, before.get(group, {}), after.get(group, {}), args.threshold, metrics, gated)
+
+    if regressions:
+        print()
+        for regression in regressions:
+            print(f"❌ {regression}")
+        sys.exit(1)
+    print(f"\n✅ No regression over {args.threshold:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Compare rows/sec of the column-wise document builder against the old
+iterrows() conversion path, and check the timestamp parser against the
+old per-cell one on values its fast path cannot take.  Exits non-zero
+when the two paths disagree; ``--output`` writes the per-path timings
+for ``compare.py``.
+
+    python bench/conversion_benchmark.py --collection inventory_items --rows 200000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from document_builder import _parse_fast, build_documents, parse_datetime_column  # noqa: E402
+
+
+def parse_datetime(date_str):
+    """The per-cell timestamp parser every loader used before document_builder"""
+    if pd.isna(date_str) or date_str == '':
+        return None
+    try:
+        return datetime.fromisoformat(str(date_str).replace('Z', '+00:00'))
+    except:
+        try:
+            return datetime.strptime(str(date_str), '%Y-%m-%d %H:%M:%S')
+        except:
+            return None
+
+
+def legacy_order_items(df):
+    """The per-row conversion every loader used before document_builder"""
+    documents = []
+    for _, row in df.iterrows():
+        doc = {
+            "item_id": int(row['id']),
+            "order_id": int(row['order_id']),
+            "user_id": int(row['user_id']),
+            "product_id": int(row['product_id']),
+            "inventory_item_id": int(row['inventory_item_id']),
+            "status": str(row['status']),
+            "created_at": parse_datetime(row['created_at']) or datetime.utcnow(),
+            "shipped_at": parse_datetime(row['shipped_at']),
+            "delivered_at": parse_datetime(row['delivered_at']),
+            "returned_at": parse_datetime(row['returned_at'])
+        }
+        documents.append(doc)
+    return documents
+
+
+def legacy_inventory_items(df):
+    """The per-row conversion every loader used before document_builder"""
+    documents = []
+    for _, row in df.iterrows():
+        doc = {
+            "inventory_id": int(row['id']),
+            "product_id": int(row['product_id']),
+            "created_at": parse_datetime(row['created_at']) or datetime.utcnow(),
+            "sold_at": parse_datetime(row['sold_at']),
+            "cost": float(row['cost']),
+            "product_category": str(row['product_category']),
+            "product_name": str(row['product_name']),
+            "product_brand": str(row['product_brand']),
+            "product_retail_price": float(row['product_retail_price']),
+            "product_department": str(row['product_department']),
+            "product_sku": str(row['product_sku']),
+            "product_distribution_center_id": int(row['product_distribution_center_id'])
+        }
+        documents.append(doc)
+    return documents
+
+
+LEGACY_CONVERTERS = {
+    "order_items": legacy_order_items,
+    "inventory_items": legacy_inventory_items,
+}
+
+
+# Well-formed but impossible timestamps, which both parsers must turn into None
+INVALID_TIMESTAMPS = [
+    "2023-13-01 10:00:00",
+    "2023-02-30 10:00:00+00:00",
+    "2023-02-29 10:00:00",
+    "2023-01-01 25:00:00",
+    "0000-00-00 00:00:00",
+]
+
+
+# Rejected by the fast path row by row, without demoting the rest of the chunk
+NON_ASCII_TIMESTAMPS = [
+    "２０２３-01-01 10:00:00",
+    "2023-01-01 10:00:00\u00a0",
+    "2023-01-01 10:00:00+00:00 ✓",
+]
+# Valid, but outside pandas' nanosecond range (1677-2262)
+OUT_OF_RANGE_TIMESTAMPS = [
+    "1500-06-01 12:00:00",
+    "1600-01-01T00:00:00.250000",
+    "2500-01-01 00:00:00.5+00:00",
+    "9999-12-31T23:59:59.999999",
+]
+
+
+def _timestamps(rng, rows, null_rate, invalid_rate=0.001):
+    """Random '%Y-%m-%d %H:%M:%S+00:00' strings with some missing and some impossible values"""
+    seconds = rng.integers(1_500_000_000, 1_700_000_000, size=rows)
+    values = pd.to_datetime(seconds, unit="s").strftime("%Y-%m-%d %H:%M:%S+00:00")
+    values = pd.Series(values, dtype=object)
+    values[rng.random(rows) < null_rate] = np.nan
+    invalid = rng.random(rows) < invalid_rate
+    values[invalid] = rng.choice(INVALID_TIMESTAMPS, size=int(invalid.sum()))
+    return values
+
+
+def synthetic_frame(collection, rows, seed=42):
+    """Build a DataFrame shaped like the CSV for the given collection"""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, rows + 1)
+    if collection == "order_items":
+        return pd.DataFrame({
+            "id": ids,
+            "order_id": rng.integers(1, rows, size=rows),
+            "user_id": rng.integers(1, rows, size=rows),
+            "product_id": rng.integers(1, 30000, size=rows),
+            "inventory_item_id": rng.integers(1, rows * 3, size=rows),
+            "status": rng.choice(["Complete", "Shipped", "Processing", "Cancelled", "Returned"], size=rows),
+            "created_at": _timestamps(rng, rows, 0.0),
+            "shipped_at": _timestamps(rng, rows, 0.35),
+            "delivered_at": _timestamps(rng, rows, 0.65),
+            "returned_at": _timestamps(rng, rows, 0.9),
+        })
+    if collection == "inventory_items":
+        return pd.DataFrame({
+            "id": ids,
+            "product_id": rng.integers(1, 30000, size=rows),
+            "created_at": _timestamps(rng, rows, 0.0),
+            "sold_at": _timestamps(rng, rows, 0.6),
+            "cost": rng.random(rows) * 100,
+            "product_category": rng.choice(["Jeans", "Tops & Tees", "Shorts", "Socks"], size=rows),
+            "product_name": rng.choice(["Slim Fit Jean", "Crew Neck Tee", "Cargo Short"], size=rows),
+            "product_brand": rng.choice(["Levi's", "Calvin Klein", "Carhartt"], size=rows),
+            "product_retail_price": rng.random(rows) * 200,
+            "product_department": rng.choice(["Men", "Women"], size=rows),
+            "product_sku": rng.choice(["A1B2C3", "D4E5F6", "G7H8I9"], size=rows),
+            "product_distribution_center_id": rng.integers(1, 11, size=rows),
+        })
+    raise ValueError(f"No synthetic data for {collection}")
+
+
+def _normalized(doc):
+    """Compare timestamps as naive UTC and ignore load-time created_at fallbacks"""
+    normalized = {}
+    for key, value in doc.items():
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        normalized[key] = value
+    normalized.pop("created_at", None)
+    return normalized
+
+
+def _naive_utc(value):
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def check_timestamp_edge_cases(rows=1000):
+    """Failures of parse_datetime_column on non-ASCII and out-of-range values mixed into plain ones"""
+    plain = _timestamps(np.random.default_rng(0), rows, 0.0, invalid_rate=0.0).tolist()
+    edge = NON_ASCII_TIMESTAMPS + OUT_OF_RANGE_TIMESTAMPS
+    values = pd.Series(plain + edge, dtype=object)
+
+    failures = []
+    fast_rows = int(_parse_fast(values.to_numpy())[1][:rows].sum())
+    if fast_rows != rows:
+        failures.append(f"only {fast_rows} of {rows} plain timestamps took the fast path next to non-ASCII ones")
+    parsed = parse_datetime_column(values)
+    for value, result in zip(values, parsed):
+        expected = _naive_utc(parse_datetime(value))
+        if result != expected:
+            failures.append(f"{value!r} parsed as {result!r}, the old parser gave {expected!r}")
+    return failures
+
+
+def _rate(func, df):
+    start = time.perf_counter()
+    documents = func(df)
+    elapsed = time.perf_counter() - start
+    return documents, len(df) / elapsed if elapsed else float("inf")
+
+
+def measure(collection="order_items", rows=100_000, csv=None):
+    """Rows/sec of both paths, their mismatched documents and the timestamp edge-case failures"""
+    df = pd.read_csv(csv) if csv else synthetic_frame(collection, rows)
+    old_docs, old_rate = _rate(LEGACY_CONVERTERS[collection], df)
+    new_docs, new_rate = _rate(lambda frame: build_documents(frame, collection), df)
+
+    failures = []
+    mismatched = sum(1 for old, new in zip(old_docs, new_docs) if _normalized(old) != _normalized(new))
+    if mismatched:
+        failures.append(f"{mismatched} of {len(df):,} {collection} documents differ from the iterrows() path")
+    failures += check_timestamp_edge_cases()
+    paths = {
+        f"{collection} {name}": {"count": len(df), "rows_per_s": round(rate), "us_per_op": round(1e6 / rate, 3)}
+        for name, rate in [("iterrows()", old_rate), ("build_documents", new_rate)]
+    }
+    return paths, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", choices=sorted(LEGACY_CONVERTERS), default="order_items")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--csv", help="Benchmark a real CSV file instead of synthetic rows")
+    parser.add_argument("--output", help="Write the per-path timings as JSON to this file")
+    args = parser.parse_args()
+
+    paths, failures = measure(args.collection, args.rows, args.csv)
+    old, new = paths[f"{args.collection} iterrows()"], paths[f"{args.collection} build_documents"]
+    print(f"Collection: {args.collection} ({new['count']:,} rows)")
+    print(f"  iterrows():      {old['rows_per_s']:>12,} rows/sec")
+    print(f"  build_documents: {new['rows_per_s']:>12,} rows/sec")
+    print(f"  speedup:         {new['rows_per_s'] / old['rows_per_s']:>12.1f}x")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print(f"✅ Same documents, and {len(NON_ASCII_TIMESTAMPS)} non-ASCII and "
+              f"{len(OUT_OF_RANGE_TIMESTAMPS)} out-of-range timestamps parsed as before")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"started_at": datetime.utcnow().isoformat(), "config": vars(args), "paths": paths}, f, indent=2)
+        print(f"Results written to {args.output}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Write a synthetic dataset in the loaders' CSV schema (see synthetic_data.py)
+
+    python bench/generate_dataset.py --rows 1000000 --output /tmp/dataset_1m
+    python data_loader_api.py  # after pointing csv_directory at it
+"""
+import argparse
+import time
+
+from synthetic_data import CHUNK_ROWS, write_dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="Approximate rows across all files")
+    parser.add_argument("--output", required=True, help="Directory for the CSV files")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows generated and written at a time")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = write_dataset(args.output, args.rows, seed=args.seed, chunk_rows=args.chunk_rows)
+    elapsed = time.perf_counter() - start
+
+    for name, count in counts.items():
+        print(f"{name:<22} {count:>12,}")
+    total = sum(counts.values())
+    print(f"✅ {total:,} rows written to {args.output} in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Ingestion throughput of each CSV loader against a MongoDB instance.
+
+Each loader runs in a fresh process so its peak RSS is its own.  Time is
+split into phases by timing the calls every loader makes:
+
+* parse   - ``pd.read_csv`` (each chunk, for chunked reads)
+* convert - ``build_documents``
+* insert  - ``insert_many`` (pymongo and Motor)
+* other   - the rest of the wall time: staging drops, counts, index
+  builds and renames
+
+In pipelined mode parsing overlaps the inserts, so phase times can add up
+to more than the wall time.  ``async_pipelined_processes`` (the async
+loader's ``--processes`` path) parses and converts in worker processes
+the timer cannot see, so that time is reported under other; it runs once
+per ``--processes`` count to show how rows/s scales with workers, and
+the workers' peak RSS is reported separately.
+
+The loaders replace whole collections, so they are pointed at a scratch
+database (``--database``), never the application's.
+
+    python bench/ingest_benchmark.py --rows 1000000 --mongodb-url mongodb://localhost:27017
+    python bench/ingest_benchmark.py --data /tmp/dataset_1m --loaders direct async_pipelined --output ingest.json
+    python bench/ingest_benchmark.py --loaders async_pipelined_processes --processes 1 2 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from synthetic_data import write_dataset  # noqa: E402
+
+# Loader -> CSV files it reads
+LOADERS = {
+    "csv_parser": ["distribution_centers", "products", "users", "orders", "inventory_items", "order_items"],
+    "direct": ["distribution_centers", "products", "users", "orders", "inventory_items", "order_items"],
+    "async": ["distribution_centers", "products", "users", "orders", "inventory_items", "order_items"],
+    "async_pipelined": ["distribution_centers", "products", "users", "orders", "inventory_items", "order_items"],
+    "async_pipelined_processes": ["distribution_centers", "products", "users", "orders", "inventory_items", "order_items"],
+    "order_items": ["order_items"],
+}
+PHASES = ["parse", "convert", "insert"]
+# Loader run once per worker process count given with --processes
+PROCESS_POOL_LOADER = "async_pipelined_processes"
+
+# Modules that hold their own MongoDB URL and database name
+LOADER_MODULES = ["database", "load_data_direct", "data_loader_api", "load_order_items_only"]
+# Modules that call build_documents through their own import of it
+CONVERTING_MODULES = ["csv_parser", "load_data_direct", "data_loader_api", "load_order_items_only", "ingest_pipeline"]
+
+
+class PhaseTimer:
+    """Seconds spent per phase, summed across threads"""
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.lock = threading.Lock()
+
+    def add(self, phase, seconds):
+        with self.lock:
+            self.seconds[phase] += seconds
+
+    def wrap(self, phase, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(phase, time.perf_counter() - start)
+        return timed
+
+    def wrap_async(self, phase, func):
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.add(phase, time.perf_counter() - start)
+        return timed
+
+    def wrap_read_csv(self, read_csv):
+        """Time pd.read_csv, including each chunk pulled from a chunked reader"""
+        def chunks(reader):
+            with reader:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        chunk = next(reader)
+                    except StopIteration:
+                        return
+                    finally:
+                        self.add("parse", time.perf_counter() - start)
+                    yield chunk
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = read_csv(*args, **kwargs)
+            finally:
+                self.add("parse", time.perf_counter() - start)
+            if kwargs.get("chunksize") or kwargs.get("iterator"):
+                return chunks(result)
+            return result
+        return timed
+
+
+def instrument(timer):
+    """Route the loaders' parse, convert and insert calls through `timer`"""
+    import importlib
+
+    import pandas as pd
+    from motor.motor_asyncio import AsyncIOMotorCollection
+    from pymongo.collection import Collection
+
+    import document_builder
+
+    pd.read_csv = timer.wrap_read_csv(pd.read_csv)
+    timed_build = timer.wrap("convert", document_builder.build_documents)
+    for name in CONVERTING_MODULES:
+        importlib.import_module(name).build_documents = timed_build
+    # Motor binds pymongo's methods when its classes are created, so both are wrapped
+    Collection.insert_many = timer.wrap("insert", Collection.insert_many)
+    AsyncIOMotorCollection.insert_many = timer.wrap_async("insert", AsyncIOMotorCollection.insert_many)
+
+
+def point_loaders_at(mongodb_url, database_name):
+    import importlib
+
+    for name in LOADER_MODULES:
+        module = importlib.import_module(name)
+        module.MONGODB_URL = mongodb_url
+        module.DATABASE_NAME = database_name
+
+
+def load(loader_name, csv_directory, processes=0):
+    """Run one loader to completion; True on success"""
+    if loader_name == "csv_parser":
+        from csv_parser import CSVParser
+        CSVParser(csv_directory).load_all_data()
+        return True
+    if loader_name == "direct":
+        from load_data_direct import DirectDataLoader
+        return DirectDataLoader(csv_directory).load_all_data()
+    if loader_name in ("async", "async_pipelined"):
+        from data_loader_api import AsyncDataLoader
+        loader = AsyncDataLoader(csv_directory, pipelined=loader_name == "async_pipelined")
+        return asyncio.run(loader.load_all_data())
+    if loader_name == PROCESS_POOL_LOADER:
+        from data_loader_api import AsyncDataLoader
+        loader = AsyncDataLoader(csv_directory, pipelined=True, processes=processes)
+        return asyncio.run(loader.load_all_data())
+    if loader_name == "order_items":
+        from load_order_items_only import OrderItemsLoader
+        return asyncio.run(_load_order_items(OrderItemsLoader(csv_directory)))
+    raise ValueError(f"Unknown loader {loader_name!r}")
+
+
+async def _load_order_items(loader):
+    if not await loader.connect():
+        return False
+    try:
+        return await loader.load_order_items_only()
+    finally:
+        await loader.disconnect()
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF):
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def run_loader(loader_name, csv_directory, mongodb_url, database_name, results, processes=0):
+    """Child process: load once and put the measurements on `results`"""
+    # Before the loaders' own basicConfig(level=INFO), which then does nothing
+    logging.basicConfig(level=logging.WARNING)
+    point_loaders_at(mongodb_url, database_name)
+    timer = PhaseTimer()
+    instrument(timer)
+    baseline_rss = _peak_rss_mb()
+
+    start = time.perf_counter()
+    try:
+        success = bool(load(loader_name, csv_directory, processes))
+        error = None if success else "loader reported a failure, see its log above"
+    except Exception as e:
+        success, error = False, str(e)
+    wall = time.perf_counter() - start
+
+    phases = {phase: round(seconds, 3) for phase, seconds in timer.seconds.items()}
+    phases["other"] = round(max(0.0, wall - sum(timer.seconds.values())), 3)
+    results.put({
+        "success": success,
+        "error": error,
+        "wall_s": round(wall, 3),
+        "phases_s": phases,
+        "baseline_rss_mb": round(baseline_rss, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        # Largest worker process, for the process pool loader
+        "workers_peak_rss_mb": round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+    })
+
+
+def count_rows(csv_directory, names):
+    rows = 0
+    for name in names:
+        path = os.path.join(csv_directory, f"{name}.csv")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                rows += max(0, sum(1 for _ in f) - 1)
+    return rows
+
+
+def benchmark(loader_name, csv_directory, args, processes=0):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(
+        target=run_loader,
+        args=(loader_name, csv_directory, args.mongodb_url, args.database, results, processes)
+    )
+    process.start()
+    process.join()
+    if process.exitcode != 0 or results.empty():
+        return {"success": False, "error": f"loader process exited with code {process.exitcode}"}
+
+    result = results.get()
+    rows = count_rows(csv_directory, LOADERS[loader_name])
+    result["rows"] = rows
+    result["rows_per_s"] = round(rows / result["wall_s"]) if result["wall_s"] else None
+    if processes:
+        result["processes"] = processes
+    return result
+
+
+def loader_runs(loader_names, process_counts):
+    """(label, loader, worker processes) for each configuration to benchmark"""
+    for loader_name in loader_names:
+        if loader_name == PROCESS_POOL_LOADER:
+            for processes in process_counts:
+                yield f"{loader_name}[{processes}]", loader_name, processes
+        else:
+            yield loader_name, loader_name, 0
+
+
+def print_scaling(runs):
+    """Best rows/s of the process pool loader per worker count, relative to the fewest workers"""
+    best = {}
+    for results in runs.values():
+        for result in results:
+            if result["success"] and result.get("processes"):
+                best[result["processes"]] = max(best.get(result["processes"], 0), result["rows_per_s"])
+    if len(best) < 2:
+        return
+    baseline = best[min(best)]
+    scaling = "  ".join(f"{processes} → {rows_per_s:,} rows/s ({rows_per_s / baseline:.2f}x)"
+                        for processes, rows_per_s in sorted(best.items()))
+    print(f"📈 {PROCESS_POOL_LOADER} by worker processes: {scaling}")
+
+
+def print_result(loader_name, result):
+    if not result["success"]:
+        print(f"❌ {loader_name:<28} failed: {result.get('error')}")
+        return
+    phases = result["phases_s"]
+    total = sum(phases.values()) or 1
+    split = "  ".join(f"{phase} {seconds:.1f}s ({seconds / total:.0%})" for phase, seconds in phases.items())
+    workers = f"  workers peak RSS {result['workers_peak_rss_mb']:>6.0f} MB" if result.get("processes") else ""
+    print(f"✅ {loader_name:<28} {result['rows']:>11,} rows  {result['wall_s']:>8.1f}s  {result['rows_per_s']:>9,} rows/s  "
+          f"peak RSS {result['peak_rss_mb']:>7.0f} MB{workers}  |  {split}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help="Directory of CSV files to load (default: generate --rows synthetic rows)")
+    parser.add_argument("--rows", type=int, default=100_000, help="Synthetic rows to generate when --data is not given")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--loaders", nargs="+", choices=list(LOADERS), default=list(LOADERS))
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per loader")
+    parser.add_argument("--processes", nargs="+", type=int, default=[1, 2, 4],
+                        help=f"Worker process counts to run {PROCESS_POOL_LOADER} with")
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="ingest_benchmark", help="Scratch database the loaders overwrite")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    from database import DATABASE_NAME
+    if args.database == DATABASE_NAME:
+        sys.exit(f"Refusing to load into the application database {DATABASE_NAME!r}; pick a scratch --database")
+
+    with tempfile.TemporaryDirectory() as generated:
+        csv_directory = args.data
+        if not csv_directory:
+            csv_directory = generated
+            start = time.perf_counter()
+            counts = write_dataset(csv_directory, args.rows, seed=args.seed)
+            print(f"Generated {sum(counts.values()):,} synthetic rows in {time.perf_counter() - start:.1f}s")
+
+        runs = {}
+        for label, loader_name, processes in loader_runs(args.loaders, args.processes):
+            runs[label] = []
+            for _ in range(args.repeat):
+                result = benchmark(loader_name, csv_directory, args, processes)
+                print_result(label, result)
+                runs[label].append(result)
+        print_scaling(runs)
+
+    if args.output:
+        config = {key: value for key, value in vars(args).items() if key != "mongodb_url"}
+        with open(args.output, "w") as f:
+            json.dump({"started_at": datetime.utcnow().isoformat(), "config": config, "loaders": runs}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Compare per-message CPU time of the compiled intent matcher against the
+any()/re.search chains ChatbotService used before, and check that both
+pick the same ID and intent for every message, follow-ups included
+(they only add a flag, never change the intent), and that follow-ups
+are flagged only when no action intent is asked for.  Exits non-zero on
+a mismatch; ``--output`` writes the per-path timings for ``compare.py``.
+
+    python bench/intent_matcher_benchmark.py --repeat 5000
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from intent_matcher import ID_PATTERNS, INTENT_KEYWORDS, IntentMatcher  # noqa: E402
+
+MESSAGES = [
+    "Hi there!",
+    "Can you show me inventory_id:67971",
+    "what's the status of order_id 5821?",
+    "I bought a jacket last week and want to return it",
+    "looking for levi jeans",
+    "track my package",
+    "inventory item id 12 please",
+    "tell me about user_id: 77 and product_id:3",
+    "Do you have these sneakers in stock in size 10?",
+    "What is your opening time on weekends? I would like to visit the store with my family",
+    "I need help with a refund for an exchange that never arrived and the support line is not answering",
+    # Follow-up phrasing around keyword intents
+    "where is that order?",
+    "track this order please",
+    "Can I return this item?",
+    "Is this item in stock?",
+    "hello, can you track this order for me?",
+    "tell me more about that order",
+    "tell me more",
+]
+
+# Message -> whether it is answered from session context when something is remembered
+FOLLOWUPS = {
+    "where is that order?": True,
+    "tell me more about that order": True,
+    "tell me more": True,
+    "what about it?": True,
+    "track this order please": False,
+    "Can I return this item?": False,
+    "Is this item in stock?": False,
+    "hello, can you track this order for me?": False,
+    "can you find me details on jeans": False,
+}
+
+
+def legacy_classify(message):
+    """The ID lookup and intent chain ChatbotService ran before IntentMatcher"""
+    patterns = [
+        r'inventory_id[:\s]+([0-9]+)',
+        r'inventory[\s_]item[\s_]id[:\s]+([0-9]+)',
+        r'product_id[:\s]+([0-9]+)',
+        r'order_id[:\s]+([0-9]+)',
+        r'user_id[:\s]+([0-9]+)',
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, message.lower())
+        if match:
+            for entity in ['inventory', 'product', 'order', 'user']:
+                if entity in pattern:
+                    return ("id", entity, int(match.group(1)))
+
+    message_lower = message.lower()
+    if any(word in message_lower for word in ['order', 'purchase', 'buy', 'bought']):
+        return ("intent", "order")
+    elif any(word in message_lower for word in ['inventory', 'inventory_item', 'stock']):
+        return ("intent", "inventory")
+    elif any(word in message_lower for word in ['product', 'item', 'search', 'find']):
+        return ("intent", "product")
+    elif any(word in message_lower for word in ['status', 'track', 'tracking', 'shipped', 'delivered']):
+        return ("intent", "status")
+    elif any(word in message_lower for word in ['return', 'refund', 'exchange']):
+        return ("intent", "return")
+    elif any(word in message_lower for word in ['hello', 'hi', 'hey', 'help']):
+        return ("intent", "greeting")
+    return ("intent", None)
+
+
+def compiled_classify(matcher, message):
+    match = matcher.match(message)
+    if match["entities"]:
+        entity, id_value = match["entities"][0]
+        return ("id", entity, id_value)
+    return ("intent", match["intent"])
+
+
+def random_messages(count, seed=42):
+    """Messages gluing keywords, ID snippets and filler together, often without spaces"""
+    rng = random.Random(seed)
+    pieces = [keyword for _, keywords in INTENT_KEYWORDS for keyword in keywords]
+    pieces += [literal for _, literal, _ in ID_PATTERNS]
+    pieces += ["inventory item id", "Inventory_Item_ID", ":", " ", ": ", "12", "7", "the", "x", "ship", "hid", "s"]
+    return [
+        rng.choice(["", " "]).join(rng.choice(pieces) for _ in range(rng.randint(1, 12)))
+        for _ in range(count)
+    ]
+
+
+def _time(func, messages, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in messages:
+            func(message)
+        samples.append((time.perf_counter() - start) / len(messages) * 1e6)
+    return statistics.median(samples)
+
+
+def measure(repeat=2000, check=20000):
+    """Microseconds per message of both paths, and the messages they disagree on"""
+    matcher = IntentMatcher()
+    failures = []
+    mismatches = [
+        message for message in MESSAGES + random_messages(check)
+        if legacy_classify(message) != compiled_classify(matcher, message)
+    ]
+    if mismatches:
+        failures.append(f"{len(mismatches)} of {len(MESSAGES) + check} messages classified differently, e.g. {mismatches[:3]!r}")
+    wrong_followups = [message for message, expected in FOLLOWUPS.items() if matcher.match(message)["followup"] != expected]
+    if wrong_followups:
+        failures.append(f"Follow-up flag wrong for {wrong_followups!r}")
+
+    paths = {
+        name: {"count": len(MESSAGES) * repeat, "us_per_op": round(_time(func, MESSAGES, repeat), 3)}
+        for name, func in [
+            ("legacy intent chain", legacy_classify),
+            ("IntentMatcher", lambda message: compiled_classify(matcher, message)),
+        ]
+    }
+    return paths, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--check", type=int, default=20000, help="Random messages to check for equivalence")
+    parser.add_argument("--output", help="Write the per-path timings as JSON to this file")
+    args = parser.parse_args()
+
+    paths, failures = measure(args.repeat, args.check)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print(f"✅ Identical results on {len(MESSAGES) + args.check} messages, "
+              f"follow-up flag right on {len(FOLLOWUPS)}")
+
+    legacy_us, compiled_us = paths["legacy intent chain"]["us_per_op"], paths["IntentMatcher"]["us_per_op"]
+    print(f"{'path':<12}{'us/message':>12}")
+    print(f"{'legacy':<12}{legacy_us:>12.2f}")
+    print(f"{'compiled':<12}{compiled_us:>12.2f}")
+    print(f"speedup: {legacy_us / compiled_us:.1f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"started_at": datetime.utcnow().isoformat(), "config": vars(args), "paths": paths}, f, indent=2)
+        print(f"Results written to {args.output}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Load test of the FastAPI app, run in-process with no network or MongoDB.
+
+The app is served through httpx's ASGI transport on the in-memory (or
+SQLite) storage backend, seeded with a synthetic dataset.  A weighted mix
+of /chat intents, /products/search and /users/{id}/orders is driven either
+at a fixed concurrency (closed loop) or at a fixed arrival rate (open
+loop; latency is measured from each request's scheduled start, so a
+stalled server is not hidden by the generator slowing down).  Throughput
+and p50/p95/p99 latency are reported per endpoint and per chat intent and
+written as JSON for ``compare.py``.
+
+    python bench/load_test.py --concurrency 32 --duration 20 --output before.json
+    python bench/load_test.py --rate 500 --mix id_lookup=50,order=50
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from synthetic_data import SEARCH_TERMS, write_dataset  # noqa: E402
+
+DEFAULT_MIX = "id_lookup=30,order=20,product=15,greeting=5,products_search=15,user_orders=15"
+
+GREETINGS = ["Hi there!", "hello", "hey, can you help me?"]
+PRODUCT_MESSAGES = ["looking for {term}", "find {term} please", "do you sell {term}?"]
+ID_MESSAGES = {
+    "order": "what's the status of order_id:{id}?",
+    "product": "show me product_id:{id}",
+    "user": "tell me about user_id:{id}",
+    "inventory": "inventory_id:{id}",
+}
+
+
+class Workload:
+    """Builds requests for each named operation from the dataset's IDs"""
+
+    def __init__(self, counts, mix, seed):
+        self.rng = random.Random(seed)
+        # Generated IDs run from 1 to the row count of each file
+        self.ids = {
+            "order": range(1, counts["orders"] + 1),
+            "product": range(1, counts["products"] + 1),
+            "user": range(1, counts["users"] + 1),
+            "inventory": range(1, counts["inventory_items"] + 1),
+        }
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+
+    def next_request(self):
+        """(endpoint, intent, method, path, json body)"""
+        operation = self.rng.choices(self.operations, self.weights)[0]
+        return getattr(self, f"_{operation}")()
+
+    def _chat(self, intent, message, user_id=None):
+        body = {"message": message, "session_id": f"bench-{self.rng.randrange(1000)}", "user_id": user_id}
+        return "POST /chat", intent, "POST", "/chat", body
+
+    def _id_lookup(self):
+        entity = self.rng.choice(list(ID_MESSAGES))
+        return self._chat("id_lookup", ID_MESSAGES[entity].format(id=self.rng.choice(self.ids[entity])))
+
+    def _order(self):
+        return self._chat("order", "show me my recent orders", user_id=self.rng.choice(self.ids["user"]))
+
+    def _product(self):
+        message = self.rng.choice(PRODUCT_MESSAGES).format(term=self.rng.choice(SEARCH_TERMS))
+        return self._chat("product", message)
+
+    def _greeting(self):
+        return self._chat("greeting", self.rng.choice(GREETINGS))
+
+    def _products_search(self):
+        return "GET /products/search", None, "GET", f"/products/search?q={self.rng.choice(SEARCH_TERMS)}&limit=10", None
+
+    def _user_orders(self):
+        return "GET /users/{id}/orders", None, "GET", f"/users/{self.rng.choice(self.ids['user'])}/orders?limit=10", None
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if not hasattr(Workload, f"_{name}"):
+            raise SystemExit(f"Unknown operation {name!r} in --mix")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def send(client, workload, samples, scheduled=None):
+    endpoint, intent, method, path, body = workload.next_request()
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, path, json=body)
+        ok = response.status_code < 400
+    except Exception:
+        ok = False
+    # Open-loop latency includes any time the request waited to be sent
+    latency = time.perf_counter() - (scheduled if scheduled is not None else start)
+    samples.append((endpoint, intent, latency * 1000, ok))
+
+
+async def closed_loop(client, workload, concurrency, duration):
+    samples = []
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await send(client, workload, samples)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+async def open_loop(client, workload, rate, duration, seed):
+    """Poisson arrivals at `rate` requests per second"""
+    samples = []
+    rng = random.Random(seed)
+    tasks = []
+    start = time.perf_counter()
+    scheduled = start
+    while scheduled < start + duration:
+        scheduled += rng.expovariate(rate)
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(client, workload, samples, scheduled)))
+    await asyncio.gather(*tasks)
+    return samples
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list"""
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"count": 0, "errors": errors}
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3),
+    }
+
+
+def report(samples, elapsed):
+    groups = {"endpoints": defaultdict(list), "intents": defaultdict(list)}
+    errors = {"endpoints": defaultdict(int), "intents": defaultdict(int)}
+    for endpoint, intent, latency, ok in samples:
+        keys = [("endpoints", endpoint)] + ([("intents", intent)] if intent else [])
+        for group, key in keys:
+            groups[group][key].append(latency)
+            if not ok:
+                errors[group][key] += 1
+
+    return {
+        "total": summarize([s[2] for s in samples], sum(not s[3] for s in samples), elapsed),
+        **{
+            group: {key: summarize(values, errors[group][key], elapsed) for key, values in sorted(by_key.items())}
+            for group, by_key in groups.items()
+        },
+    }
+
+
+def print_table(title, rows):
+    print(f"\n{title}")
+    print(f"{'':<24} {'count':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, row in rows.items():
+        if row["count"]:
+            print(f"{name:<24} {row['count']:>7} {row['errors']:>5} {row['throughput_rps']:>8.1f} "
+                  f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f}")
+
+
+async def run(args, counts):
+    # Imported here so STORAGE_BACKEND and DATA_DIRECTORY are already set
+    import httpx
+    import main as api
+
+    workload = Workload(counts, parse_mix(args.mix), args.seed)
+    async with api.lifespan(api.app):
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            if args.warmup:
+                await closed_loop(client, workload, args.concurrency, args.warmup)
+
+            start = time.perf_counter()
+            if args.rate:
+                samples = await open_loop(client, workload, args.rate, args.duration, args.seed)
+            else:
+                samples = await closed_loop(client, workload, args.concurrency, args.duration)
+            elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--rows", type=int, default=20_000, help="Approximate rows of synthetic data")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Comma-separated operation=weight pairs")
+    parser.add_argument("--concurrency", type=int, default=32, help="Closed-loop clients (ignored with --rate)")
+    parser.add_argument("--rate", type=float, help="Open-loop arrival rate in requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured closed-loop seconds first")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as data_directory:
+        counts = write_dataset(data_directory, args.rows, seed=args.seed)
+        os.environ["STORAGE_BACKEND"] = args.backend
+        os.environ["DATA_DIRECTORY"] = data_directory
+        os.environ["SQLITE_PATH"] = os.path.join(data_directory, "bench.db")
+        samples, elapsed = asyncio.run(run(args, counts))
+
+    results = {
+        "started_at": datetime.utcnow().isoformat(),
+        "config": vars(args),
+        "python": platform.python_version(),
+        "elapsed_s": round(elapsed, 3),
+        **report(samples, elapsed),
+    }
+
+    total = results["total"]
+    print(f"{total['count']} requests in {elapsed:.1f}s ({total.get('throughput_rps', 0)} req/s), {total['errors']} errors")
+    print_table("Per endpoint", results["endpoints"])
+    print_table("Per chat intent", results["intents"])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
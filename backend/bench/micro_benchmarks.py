@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Run the in-process micro-benchmarks and collect their per-path timings
+in one result file for ``compare.py``:
+
+* conversion     - CSV rows to documents, build_documents against iterrows()
+* intent_matcher - chat message classification, IntentMatcher against the
+  old keyword chain
+* product_search - the in-memory product index against a $regex scan
+
+Each benchmark's correctness check (same documents, same intents) has to
+pass too; the run exits non-zero when one fails.
+
+    python bench/micro_benchmarks.py --output before.json
+    python bench/micro_benchmarks.py --output after.json
+    python bench/compare.py before.json after.json --threshold 10
+"""
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+
+import conversion_benchmark
+import intent_matcher_benchmark
+import product_search_benchmark
+
+
+def run_conversion(args):
+    return conversion_benchmark.measure("order_items", args.rows)
+
+
+def run_intent_matcher(args):
+    return intent_matcher_benchmark.measure()
+
+
+def run_product_search(args):
+    paths, _, _ = product_search_benchmark.measure()
+    return paths, []
+
+
+BENCHMARKS = {
+    "conversion": run_conversion,
+    "intent_matcher": run_intent_matcher,
+    "product_search": run_product_search,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--rows", type=int, default=100_000, help="Synthetic rows for the conversion benchmark")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    paths = {}
+    failures = []
+    for name in args.benchmarks:
+        benchmark_paths, benchmark_failures = BENCHMARKS[name](args)
+        paths.update(benchmark_paths)
+        failures += [f"{name}: {failure}" for failure in benchmark_failures]
+
+    print(f"{'path':<40}{'us/op':>12}")
+    for name, stats in paths.items():
+        print(f"{name:<40}{stats['us_per_op']:>12.3f}")
+    for failure in failures:
+        print(f"❌ {failure}")
+
+    if args.output:
+        results = {
+            "started_at": datetime.utcnow().isoformat(),
+            "config": vars(args),
+            "python": platform.python_version(),
+            "paths": paths,
+        }
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
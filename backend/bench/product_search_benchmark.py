@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Compare product search latency of the in-memory index against the
+unanchored $regex $or scan it replaced.  ``--output`` writes the
+per-path timings for ``compare.py``.
+
+    python bench/product_search_benchmark.py --rows 30000
+    python bench/product_search_benchmark.py --mongodb-url mongodb://localhost:27017
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from pymongo import MongoClient
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from document_builder import build_documents  # noqa: E402
+from product_search import FIELD_WEIGHTS, ProductSearchIndex, tokenize  # noqa: E402
+
+QUERIES = [
+    "jeans", "levi", "shoe", "women tops", "calvin klein", "socks",
+    "swim", "active", "sweater men", "leggings", "dress", "north face jacket",
+]
+
+
+def regex_search_query(terms):
+    """The unanchored case-insensitive $regex query the index replaces"""
+    return {
+        "$or": [
+            {field: {"$regex": re.escape(term), "$options": "i"}}
+            for term in terms
+            for field in FIELD_WEIGHTS
+        ]
+    }
+
+
+def synthetic_products(rows, seed=42):
+    """Product documents with a realistic mix of names, brands and categories"""
+    rng = np.random.default_rng(seed)
+    adjectives = ["Slim", "Classic", "Relaxed", "Vintage", "Active", "Cozy", "Striped", "Essential"]
+    items = ["Jeans", "Tee", "Sweater", "Jacket", "Dress", "Shorts", "Leggings", "Socks", "Swim Trunks", "Hoodie"]
+    brands = ["Levi's", "Calvin Klein", "Carhartt", "The North Face", "Nike", "Columbia", "Hanes", "Allegra K"]
+    categories = ["Jeans", "Tops & Tees", "Sweaters", "Outerwear & Coats", "Dresses", "Shorts", "Active", "Socks", "Swim"]
+    df = pd.DataFrame({
+        "id": np.arange(1, rows + 1),
+        "cost": rng.random(rows) * 50,
+        "category": rng.choice(categories, size=rows),
+        "name": [f"{a} {b} {i}" for a, b, i in zip(rng.choice(adjectives, size=rows), rng.choice(items, size=rows), rng.integers(1, 1000, size=rows))],
+        "brand": rng.choice(brands, size=rows),
+        "retail_price": rng.random(rows) * 120,
+        "department": rng.choice(["Men", "Women"], size=rows),
+        "sku": [f"SKU{i:08d}" for i in range(rows)],
+        "distribution_center_id": rng.integers(1, 11, size=rows),
+    })
+    return build_documents(df, "products")
+
+
+def regex_scan(products, terms, limit):
+    """What MongoDB does for the $regex $or query: scan until `limit` hits"""
+    patterns = [re.compile(re.escape(term), re.IGNORECASE) for term in terms]
+    results = []
+    for product in products:
+        if any(pattern.search(str(product.get(field, ""))) for pattern in patterns for field in FIELD_WEIGHTS):
+            results.append(product)
+            if len(results) >= limit:
+                break
+    return results
+
+
+def _time(func, queries, repeat):
+    samples = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            func(query)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": statistics.median(samples),
+        "p95": samples[int(len(samples) * 0.95) - 1],
+        "max": samples[-1],
+    }
+
+
+def measure(rows=30_000, csv=None, limit=10, repeat=20, mongodb_url=None, database="ecommerce_chatbot"):
+    """Per-query latency of each search path, and the index build time"""
+    products = build_documents(pd.read_csv(csv), "products") if csv else synthetic_products(rows)
+
+    index = ProductSearchIndex()
+    start = time.perf_counter()
+    index.build_from(products)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    results = {
+        "index": _time(lambda q: index.search([q], limit), QUERIES, repeat),
+        "regex scan (in-process)": _time(lambda q: regex_scan(products, tokenize(q), limit), QUERIES, repeat),
+    }
+    if mongodb_url:
+        collection = MongoClient(mongodb_url)[database].products
+        results["$regex (MongoDB)"] = _time(
+            lambda q: list(collection.find(regex_search_query(tokenize(q))).limit(limit)),
+            QUERIES, repeat
+        )
+
+    paths = {
+        f"product search {name}": {
+            "count": len(QUERIES) * repeat,
+            # The mean: the scan's median hides its slow queries
+            "us_per_op": round(stats["mean"] * 1000, 3),
+            **{f"{key}_ms": round(value, 3) for key, value in stats.items()},
+        }
+        for name, stats in results.items()
+    }
+    return paths, len(products), build_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=30_000, help="Synthetic products to index")
+    parser.add_argument("--csv", help="Use a real products.csv instead of synthetic products")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--mongodb-url", help="Also time the $regex query against this MongoDB products collection")
+    parser.add_argument("--database", default="ecommerce_chatbot")
+    parser.add_argument("--output", help="Write the per-path timings as JSON to this file")
+    args = parser.parse_args()
+
+    paths, products, build_ms = measure(args.rows, args.csv, args.limit, args.repeat, args.mongodb_url, args.database)
+
+    print(f"{products:,} products, index built in {build_ms:.0f} ms")
+    print(f"{'path':<26}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, stats in paths.items():
+        name = name.removeprefix("product search ")
+        print(f"{name:<26}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['max_ms']:>10.3f}")
+
+    if args.output:
+        config = {key: value for key, value in vars(args).items() if key != "mongodb_url"}
+        with open(args.output, "w") as f:
+            json.dump({"started_at": datetime.utcnow().isoformat(), "config": config, "paths": paths}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
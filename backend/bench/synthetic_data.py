@@ -0,0 +1,290 @@
+"""
+Synthetic e-commerce dataset in the loaders' CSV schema, for benchmarks.
+
+Files are written in chunks, so any size from a few thousand to tens of
+millions of rows fits in a bounded amount of memory.  Every column is a
+deterministic function of the row's ID (and the seed), which keeps the
+data referentially consistent across chunks without holding the parent
+tables in memory:
+
+* every order belongs to an existing user, and is created after them
+* every order item belongs to an order (same user, status and dates)
+  and is backed by its own sold inventory item of the same product
+* inventory items carry the denormalized fields of their product
+
+Collection sizes follow the proportions of the Looker "thelook" dataset
+the loaders were written for, including its null timestamps: shipped,
+delivered and returned dates only exist for orders that reached that
+status, and unsold inventory has no ``sold_at``.
+"""
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+
+ADJECTIVES = ["Slim", "Classic", "Relaxed", "Vintage", "Active", "Cozy", "Striped", "Essential"]
+ITEMS = ["Jeans", "Tee", "Sweater", "Jacket", "Dress", "Shorts", "Leggings", "Socks", "Swim Trunks", "Hoodie"]
+BRANDS = ["Levi's", "Calvin Klein", "Carhartt", "The North Face", "Nike", "Columbia", "Hanes", "Allegra K"]
+CATEGORIES = ["Jeans", "Tops & Tees", "Sweaters", "Outerwear & Coats", "Dresses", "Shorts", "Active", "Socks", "Swim"]
+FIRST_NAMES = ["Ann", "Ben", "Chloe", "Dev", "Eva", "Farid", "Gus", "Hana", "Ivan", "Julia"]
+LAST_NAMES = ["Lee", "Smith", "Garcia", "Khan", "Novak", "Okafor", "Rossi", "Tanaka"]
+LOCATIONS = [("California", "Los Angeles"), ("Texas", "Austin"), ("New York", "Brooklyn"), ("Florida", "Miami"), ("Illinois", "Chicago")]
+TRAFFIC_SOURCES = ["Search", "Organic", "Email", "Display", "Facebook"]
+DISTRIBUTION_CENTERS = 10
+
+# Order status mix, and the timestamps each status has (the rest are null)
+ORDER_STATUSES = ["Processing", "Shipped", "Complete", "Cancelled", "Returned"]
+ORDER_STATUS_WEIGHTS = [0.20, 0.30, 0.25, 0.15, 0.10]
+SHIPPED_STATUSES = ["Shipped", "Complete", "Returned"]
+DELIVERED_STATUSES = ["Complete", "Returned"]
+# Items per order
+ITEMS_PER_ORDER = [1, 2, 3, 4]
+ITEMS_PER_ORDER_WEIGHTS = [0.67, 0.20, 0.08, 0.05]
+
+# Share of the requested rows per collection; order items follow from the
+# orders' item counts and inventory from the order items
+ROW_SHARES = {"products": 0.03, "users": 0.11, "orders": 0.135}
+UNSOLD_PER_SOLD = 1.6
+
+# Words a shopper would type into product search
+SEARCH_TERMS = [item.split()[0].lower() for item in ITEMS] + ["levi", "nike", "north face", "carhartt", "women", "men"]
+
+CHUNK_ROWS = 200_000
+
+_START = np.datetime64("2019-01-01T00:00:00", "s")
+_SPAN_SECONDS = 5 * 365 * 24 * 3600
+_DAY = 24 * 3600
+
+
+def _mix(ids, salt):
+    """Well-spread uint64 hash of each ID (splitmix64)"""
+    x = ids.astype(np.uint64) + np.uint64((salt * 0x9E3779B97F4A7C15) % 2**64)
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return x
+
+
+def _uniform(ids, salt):
+    return (_mix(ids, salt) >> np.uint64(11)).astype(np.float64) / 2**53
+
+
+def _integers(ids, salt, low, high):
+    return low + (_mix(ids, salt) % np.uint64(high - low)).astype(np.int64)
+
+
+def _pick(choices, ids, salt, weights=None):
+    choices = np.asarray(choices, dtype=object)
+    if weights is None:
+        return choices[_mix(ids, salt) % np.uint64(len(choices))]
+    bins = np.cumsum(weights) / np.sum(weights)
+    return choices[np.minimum(np.searchsorted(bins, _uniform(ids, salt), side="right"), len(choices) - 1)]
+
+
+def _seconds(values):
+    return values.astype(np.int64).astype("timedelta64[s]")
+
+
+def _format(times, present=None):
+    """'YYYY-MM-DD HH:MM:SS+00:00' strings, NaN where `present` is False"""
+    text = pd.Series(np.datetime_as_string(times, unit="s")).str.replace("T", " ", regex=False) + "+00:00"
+    return text if present is None else text.where(present)
+
+
+class DatasetGenerator:
+    def __init__(self, seed=42):
+        self.seed = seed
+
+    def _salt(self, name):
+        """Independent hash stream per generated column"""
+        return self.seed * 1_000_003 + zlib.crc32(name.encode())
+
+    # Columns derived from IDs, shared by every collection that needs them
+
+    def _user_created(self, user_ids):
+        return _START + _seconds(_integers(user_ids, self._salt("user_created"), 0, _SPAN_SECONDS // 2))
+
+    def _user_gender(self, user_ids):
+        return _pick(["F", "M"], user_ids, self._salt("user_gender"))
+
+    def _product_columns(self, product_ids):
+        cost = np.round(5 + _uniform(product_ids, self._salt("product_cost")) * 95, 2)
+        adjectives = _pick(ADJECTIVES, product_ids, self._salt("product_adjective"))
+        items = _pick(ITEMS, product_ids, self._salt("product_item"))
+        return {
+            "cost": cost,
+            "category": _pick(CATEGORIES, product_ids, self._salt("product_category")),
+            "name": adjectives + " " + items + " " + product_ids.astype(str).astype(object),
+            "brand": _pick(BRANDS, product_ids, self._salt("product_brand")),
+            "retail_price": np.round(cost * (1.5 + 1.5 * _uniform(product_ids, self._salt("product_markup"))), 2),
+            "department": _pick(["Men", "Women"], product_ids, self._salt("product_department")),
+            "sku": pd.Series(product_ids).map("SKU{:08d}".format).to_numpy(),
+            "distribution_center_id": _integers(product_ids, self._salt("product_center"), 1, DISTRIBUTION_CENTERS + 1),
+        }
+
+    def _order_columns(self, order_ids, users):
+        user_ids = _integers(order_ids, self._salt("order_user"), 1, users + 1)
+        status = _pick(ORDER_STATUSES, order_ids, self._salt("order_status"), ORDER_STATUS_WEIGHTS)
+        created = self._user_created(user_ids) + _seconds(_integers(order_ids, self._salt("order_created"), 0, _SPAN_SECONDS // 2))
+        shipped = created + _seconds(_integers(order_ids, self._salt("order_shipped"), 3600, 3 * _DAY))
+        delivered = shipped + _seconds(_integers(order_ids, self._salt("order_delivered"), 3600, 7 * _DAY))
+        returned = delivered + _seconds(_integers(order_ids, self._salt("order_returned"), 3600, 30 * _DAY))
+        return {
+            "user_id": user_ids,
+            "status": status,
+            "created": created,
+            "created_at": _format(created),
+            "shipped_at": _format(shipped, np.isin(status, SHIPPED_STATUSES)),
+            "delivered_at": _format(delivered, np.isin(status, DELIVERED_STATUSES)),
+            "returned_at": _format(returned, status == "Returned"),
+            "num_of_item": _pick(ITEMS_PER_ORDER, order_ids, self._salt("order_items"), ITEMS_PER_ORDER_WEIGHTS).astype(np.int64),
+        }
+
+    # One chunk of each CSV
+
+    def distribution_centers(self):
+        ids = np.arange(1, DISTRIBUTION_CENTERS + 1)
+        return pd.DataFrame({
+            "id": ids,
+            "name": [f"Center {i}" for i in ids],
+            "latitude": np.round(25 + _uniform(ids, self._salt("center_lat")) * 23, 4),
+            "longitude": np.round(-122 + _uniform(ids, self._salt("center_lon")) * 51, 4),
+        })
+
+    def products(self, ids):
+        return pd.DataFrame({"id": ids, **self._product_columns(ids)})
+
+    def users(self, ids):
+        location = _integers(ids, self._salt("user_location"), 0, len(LOCATIONS))
+        return pd.DataFrame({
+            "id": ids,
+            "first_name": _pick(FIRST_NAMES, ids, self._salt("user_first")),
+            "last_name": _pick(LAST_NAMES, ids, self._salt("user_last")),
+            "email": pd.Series(ids).map("user{}@example.com".format).to_numpy(),
+            "age": _integers(ids, self._salt("user_age"), 12, 71),
+            "gender": self._user_gender(ids),
+            "state": np.array([state for state, _ in LOCATIONS], dtype=object)[location],
+            "street_address": pd.Series(ids).map("{} Main St".format).to_numpy(),
+            "postal_code": _integers(ids, self._salt("user_postal"), 10000, 100000),
+            "city": np.array([city for _, city in LOCATIONS], dtype=object)[location],
+            "country": "United States",
+            "latitude": np.round(25 + _uniform(ids, self._salt("user_lat")) * 23, 4),
+            "longitude": np.round(-122 + _uniform(ids, self._salt("user_lon")) * 51, 4),
+            "traffic_source": _pick(TRAFFIC_SOURCES, ids, self._salt("user_source")),
+            "created_at": _format(self._user_created(ids)),
+        })
+
+    def orders(self, ids, users):
+        columns = self._order_columns(ids, users)
+        return pd.DataFrame({
+            "order_id": ids,
+            "user_id": columns["user_id"],
+            "status": columns["status"],
+            "gender": self._user_gender(columns["user_id"]),
+            "created_at": columns["created_at"],
+            "returned_at": columns["returned_at"],
+            "shipped_at": columns["shipped_at"],
+            "delivered_at": columns["delivered_at"],
+            "num_of_item": columns["num_of_item"],
+        })
+
+    def order_items(self, order_ids, users, products, first_item_id):
+        """Order items of a chunk of orders, and the sold inventory items behind them"""
+        columns = self._order_columns(order_ids, users)
+        repeat = columns["num_of_item"]
+        item_ids = np.arange(first_item_id, first_item_id + repeat.sum())
+        product_ids = _integers(item_ids, self._salt("item_product"), 1, products + 1)
+
+        def expand(values):
+            return np.repeat(np.asarray(values), repeat)
+
+        order_items = pd.DataFrame({
+            "id": item_ids,
+            "order_id": expand(order_ids),
+            "user_id": expand(columns["user_id"]),
+            "product_id": product_ids,
+            "inventory_item_id": item_ids,
+            "status": expand(columns["status"]),
+            "created_at": expand(columns["created_at"]),
+            "shipped_at": expand(columns["shipped_at"]),
+            "delivered_at": expand(columns["delivered_at"]),
+            "returned_at": expand(columns["returned_at"]),
+        })
+        sold_at = expand(columns["created"])
+        stocked_at = sold_at - _seconds(_integers(item_ids, self._salt("item_stocked"), _DAY, 90 * _DAY))
+        inventory = self._inventory(item_ids, product_ids, stocked_at, _format(sold_at))
+        return order_items, inventory
+
+    def unsold_inventory(self, ids, products):
+        product_ids = _integers(ids, self._salt("stock_product"), 1, products + 1)
+        stocked_at = _START + _seconds(_integers(ids, self._salt("stock_created"), 0, _SPAN_SECONDS))
+        return self._inventory(ids, product_ids, stocked_at, np.nan)
+
+    def _inventory(self, ids, product_ids, stocked_at, sold_at):
+        product = self._product_columns(product_ids)
+        return pd.DataFrame({
+            "id": ids,
+            "product_id": product_ids,
+            "created_at": _format(stocked_at),
+            "sold_at": sold_at,
+            "cost": product["cost"],
+            "product_category": product["category"],
+            "product_name": product["name"],
+            "product_brand": product["brand"],
+            "product_retail_price": product["retail_price"],
+            "product_department": product["department"],
+            "product_sku": product["sku"],
+            "product_distribution_center_id": product["distribution_center_id"],
+        })
+
+
+def dataset_sizes(rows):
+    """Products, users and orders for about `rows` rows in total"""
+    return {name: max(1, round(rows * share)) for name, share in ROW_SHARES.items()}
+
+
+class _CSVWriter:
+    def __init__(self, directory, name):
+        self.path = os.path.join(directory, f"{name}.csv")
+        self.rows = 0
+
+    def write(self, df):
+        df.to_csv(self.path, mode="a" if self.rows else "w", header=not self.rows, index=False)
+        self.rows += len(df)
+
+
+def _chunks(total, chunk_rows, first=1):
+    for start in range(first, first + total, chunk_rows):
+        yield np.arange(start, min(start + chunk_rows, first + total))
+
+
+def write_dataset(directory, rows=20_000, seed=42, chunk_rows=CHUNK_ROWS):
+    """Write every CSV for about `rows` rows under `directory`; returns rows per file"""
+    os.makedirs(directory, exist_ok=True)
+    generator = DatasetGenerator(seed)
+    sizes = dataset_sizes(rows)
+    writers = {name: _CSVWriter(directory, name) for name in
+               ["distribution_centers", "products", "users", "orders", "order_items", "inventory_items"]}
+
+    writers["distribution_centers"].write(generator.distribution_centers())
+    for ids in _chunks(sizes["products"], chunk_rows):
+        writers["products"].write(generator.products(ids))
+    for ids in _chunks(sizes["users"], chunk_rows):
+        writers["users"].write(generator.users(ids))
+
+    # Orders, their items and the sold inventory behind them, chunk by chunk
+    order_chunk = max(1, chunk_rows // 2)
+    for ids in _chunks(sizes["orders"], order_chunk):
+        writers["orders"].write(generator.orders(ids, sizes["users"]))
+        order_items, sold = generator.order_items(ids, sizes["users"], sizes["products"], writers["order_items"].rows + 1)
+        writers["order_items"].write(order_items)
+        writers["inventory_items"].write(sold)
+
+    sold = writers["order_items"].rows
+    for ids in _chunks(round(sold * UNSOLD_PER_SOLD), chunk_rows, first=sold + 1):
+        writers["inventory_items"].write(generator.unsold_inventory(ids, sizes["products"]))
+
+    return {name: writer.rows for name, writer in writers.items()}
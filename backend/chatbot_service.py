@@ -1,24 +1,47 @@
-from database import get_database
+from repositories import get_repositories
 from models import ChatMessage
+from product_search import search_products
+from intent_matcher import IntentMatcher
+from lookup_cache import lookup_cache
+from history_buffer import ChatHistoryWriter
+from session_context import session_contexts
+from projections import projection
+from metrics import chatbot_response_duration_seconds
 from datetime import datetime
+import asyncio
 import logging
-import re
+import time
 
 logger = logging.getLogger(__name__)
 
+# Messages of one batch processed at the same time
+BATCH_CONCURRENCY = 16
+
 class ChatbotService:
     def __init__(self):
-        self.db = None
+        self.repos = None
+        self.history = None
+        self.matcher = IntentMatcher()
     
     async def initialize(self):
-        """Initialize database connection"""
-        self.db = get_database()
+        """Use the connected storage backend"""
+        self.repos = get_repositories()
+        self.history = ChatHistoryWriter(self.repos.chat_history)
+        await self.history.start()
+    
+    async def shutdown(self):
+        """Flush buffered chat history"""
+        if self.history:
+            await self.history.stop()
     
     async def process_message(self, message: str, session_id: str, user_id: int = None) -> str:
         """Process user message and generate response"""
         try:
+            context = session_contexts.get(session_id)
+            user_id = session_contexts.resolve_user(context, user_id)
+            
             # Simple rule-based responses for now
-            response = await self._generate_response(message, user_id)
+            response = await self._generate_response(message, user_id, context=context)
             
             # Save chat history
             await self._save_chat_history(session_id, message, response, user_id)
@@ -29,66 +52,161 @@ class ChatbotService:
             logger.error(f"Error processing message: {e}")
             return "I'm sorry, I encountered an error. Please try again."
     
-    async def _generate_response(self, message: str, user_id: int = None) -> str:
-        """Generate chatbot response based on message content"""
-        message_lower = message.lower()
+    async def process_batch(self, requests, concurrency: int = BATCH_CONCURRENCY):
+        """Process many chat requests concurrently, returning responses in input order"""
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def respond(request):
+            """Response and the user id it was answered for (the session's when the request has none)"""
+            async with semaphore:
+                user_id = request.user_id
+                try:
+                    context = session_contexts.get(request.session_id)
+                    user_id = session_contexts.resolve_user(context, user_id)
+                    return await self._generate_response(request.message, user_id, context=context), user_id
+                except Exception as e:
+                    logger.error(f"Error processing message: {e}")
+                    return "I'm sorry, I encountered an error. Please try again.", user_id
+        
+        results = await asyncio.gather(*(respond(request) for request in requests))
+        
+        # Save the whole batch's chat history in one write
+        await self._save_chat_history_many([
+            self._chat_doc(request.session_id, request.message, response, user_id)
+            for request, (response, user_id) in zip(requests, results)
+        ])
+        
+        return [response for response, _ in results]
+    
+    async def stream_message(self, message: str, session_id: str, user_id: int = None):
+        """Yield the response in pieces as records come back, then save it"""
+        chunks = []
+        context = session_contexts.get(session_id)
+        user_id = session_contexts.resolve_user(context, user_id)
+        try:
+            async for chunk in self._stream_response(message, user_id, context):
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            logger.error(f"Error streaming message: {e}")
+            chunk = "I'm sorry, I encountered an error. Please try again."
+            chunks.append(chunk)
+            yield chunk
+        
+        await self._save_chat_history(session_id, message, "".join(chunks), user_id)
+    
+    async def _stream_response(self, message: str, user_id: int = None, context: dict = None):
+        """Stream multi-record answers; everything else is one chunk"""
+        match = self.matcher.match(message)
+        
+        stream = None
+        if not match["entities"] and not self._answer_from_context(context, match):
+            if match["intent"] == "order" and user_id:
+                stream = self._stream_order_query(user_id, context)
+            elif match["intent"] == "product" and self._product_search_terms(message):
+                stream = self._stream_product_query(message, context)
+        
+        if stream is None:
+            yield await self._generate_response(message, user_id, match, context)
+            return
+        
+        # Includes the time the client takes to read each chunk
+        start = time.perf_counter()
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            chatbot_response_duration_seconds.labels(self._intent_label(match)).observe(time.perf_counter() - start)
+    
+    def _intent_label(self, match: dict) -> str:
+        """Latency label of a classified message"""
+        if match["entities"]:
+            return "id_lookup"
+        if match["followup"]:
+            return "followup"
+        return match["intent"] or "fallback"
+    
+    async def _generate_response(self, message: str, user_id: int = None, match: dict = None, context: dict = None) -> str:
+        """Generate chatbot response based on message content, timed per intent"""
+        # Intent and ID entities from a single scan of the message
+        match = match or self.matcher.match(message)
+        start = time.perf_counter()
+        try:
+            return await self._respond(message, user_id, match, context)
+        finally:
+            chatbot_response_duration_seconds.labels(self._intent_label(match)).observe(time.perf_counter() - start)
+    
+    async def _respond(self, message: str, user_id: int, match: dict, context: dict = None) -> str:
+        intent = match["intent"]
         
         # Check for specific ID-based queries first
-        id_response = await self._handle_id_based_query(message)
+        id_response = await self._handle_id_based_query(match["entities"], context)
         if id_response:
             return id_response
         
+        # Follow-ups about something already looked up in this session
+        followup_response = self._answer_from_context(context, match)
+        if followup_response:
+            return followup_response
+        
         # Order-related queries
-        if any(word in message_lower for word in ['order', 'purchase', 'buy', 'bought']):
+        if intent == "order":
             if user_id:
-                return await self._handle_order_query(user_id)
+                return await self._handle_order_query(user_id, context)
             else:
                 return "I can help you with your orders! Please provide your user ID or email to look up your order history."
         
         # Inventory-related queries
-        elif any(word in message_lower for word in ['inventory', 'inventory_item', 'stock']):
+        elif intent == "inventory":
             return await self._handle_inventory_query(message)
         
         # Product-related queries
-        elif any(word in message_lower for word in ['product', 'item', 'search', 'find']):
-            return await self._handle_product_query(message)
+        elif intent == "product":
+            return await self._handle_product_query(message, context)
         
         # Status queries
-        elif any(word in message_lower for word in ['status', 'track', 'tracking', 'shipped', 'delivered']):
+        elif intent == "status":
             return "I can help you track your order status. Please provide your order ID or let me know which recent order you'd like to check."
         
         # Return/refund queries
-        elif any(word in message_lower for word in ['return', 'refund', 'exchange']):
+        elif intent == "return":
             return "I can assist you with returns and refunds. Our return policy allows returns within 30 days of delivery. Would you like me to help you initiate a return?"
         
         # Greeting
-        elif any(word in message_lower for word in ['hello', 'hi', 'hey', 'help']):
+        elif intent == "greeting":
             return "Hello! I'm your customer service assistant. I can help you with orders, product information, tracking, returns, and more. How can I assist you today?"
         
         # Default response
         else:
             return "I'm here to help! I can assist you with orders, product searches, order tracking, returns, and general customer service questions. What would you like to know?"
     
-    async def _handle_order_query(self, user_id: int) -> str:
+    def _answer_from_context(self, context: dict, match: dict) -> str:
+        """Answer a follow-up from the session's last resolved entity, if any"""
+        # Otherwise the message is answered by its keyword intent
+        if not match["followup"]:
+            return None
+        
+        # "that order" prefers the remembered order over whatever came last
+        remembered = session_contexts.recall(context, preferred=[match["refers_to"]] if match["refers_to"] else ())
+        if not remembered:
+            return None
+        
+        entity, document = remembered
+        return getattr(self, f"_format_{entity}")(document)
+    
+    async def _handle_order_query(self, user_id: int, context: dict = None) -> str:
         """Handle order-related queries"""
         try:
             # Get recent orders for user
-            orders_collection = self.db.orders
-            recent_orders = await orders_collection.find(
-                {"user_id": user_id}
-            ).sort("created_at", -1).limit(5).to_list(length=5)
+            recent_orders = await self.repos.orders.recent_for_user(user_id, limit=5, projection=projection("recent_orders"))
             
             if not recent_orders:
                 return "I couldn't find any orders for your account. If you believe this is an error, please contact our support team."
             
+            session_contexts.remember(context, "order", recent_orders[0])
             response = f"I found {len(recent_orders)} recent order(s) for you:\n\n"
             for order in recent_orders:
-                status = order.get('status', 'Unknown')
-                order_id = order.get('order_id', 'N/A')
-                created_at = order.get('created_at', 'Unknown')
-                num_items = order.get('num_of_item', 0)
-                
-                response += f"• Order #{order_id}: {status} - {num_items} item(s) - Placed on {created_at}\n"
+                response += self._format_order_line(order)
             
             response += "\nWould you like more details about any specific order?"
             return response
@@ -97,41 +215,53 @@ class ChatbotService:
             logger.error(f"Error handling order query: {e}")
             return "I'm having trouble accessing your order information right now. Please try again in a moment."
     
-    async def _handle_product_query(self, message: str) -> str:
+    async def _stream_order_query(self, user_id: int, context: dict = None):
+        """Stream recent orders one line per document as the backend yields them"""
+        yield "Here are your most recent orders:\n\n"
+        try:
+            orders = self.repos.orders.iter_recent_for_user(user_id, limit=5, projection=projection("recent_orders"))
+            found = 0
+            async for order in orders:
+                if not found:
+                    session_contexts.remember(context, "order", order)
+                found += 1
+                yield self._format_order_line(order)
+            
+            if not found:
+                yield "I couldn't find any orders for your account. If you believe this is an error, please contact our support team."
+            else:
+                yield "\nWould you like more details about any specific order?"
+        
+        except Exception as e:
+            logger.error(f"Error streaming order query: {e}")
+            yield "I'm having trouble accessing your order information right now. Please try again in a moment."
+    
+    def _format_order_line(self, order: dict) -> str:
+        status = order.get('status', 'Unknown')
+        order_id = order.get('order_id', 'N/A')
+        created_at = order.get('created_at', 'Unknown')
+        num_items = order.get('num_of_item', 0)
+        
+        return f"• Order #{order_id}: {status} - {num_items} item(s) - Placed on {created_at}\n"
+    
+    async def _handle_product_query(self, message: str, context: dict = None) -> str:
         """Handle product search queries"""
         try:
-            # Extract potential product keywords
-            words = message.lower().split()
-            search_terms = [word for word in words if len(word) > 3 and word not in ['product', 'item', 'search', 'find', 'looking', 'want']]
+            search_terms = self._product_search_terms(message)
             
             if not search_terms:
                 return "I can help you find products! Please tell me what you're looking for - for example, 'shoes', 'electronics', or a specific brand name."
             
-            # Search products in database
-            products_collection = self.db.products
-            search_query = {"$or": []}
-            
-            for term in search_terms[:3]:  # Limit to first 3 terms
-                search_query["$or"].extend([
-                    {"name": {"$regex": term, "$options": "i"}},
-                    {"brand": {"$regex": term, "$options": "i"}},
-                    {"category": {"$regex": term, "$options": "i"}},
-                    {"department": {"$regex": term, "$options": "i"}}
-                ])
-            
-            products = await products_collection.find(search_query).limit(5).to_list(length=5)
+            # Ranked search over the in-memory product index
+            products = await search_products(self.repos, search_terms[:3], limit=5, projection=projection("chatbot_product_search"))  # Limit to first 3 terms
             
             if not products:
                 return f"I couldn't find any products matching '{' '.join(search_terms)}'. Try different keywords or browse our categories."
             
+            session_contexts.remember(context, "product", products[0])
             response = f"I found {len(products)} product(s) matching your search:\n\n"
             for product in products:
-                name = product.get('name', 'Unknown')
-                brand = product.get('brand', 'Unknown')
-                price = product.get('retail_price', 0)
-                category = product.get('category', 'Unknown')
-                
-                response += f"• {name} by {brand} - ${price:.2f} ({category})\n"
+                response += self._format_product_line(product)
             
             response += "\nWould you like more details about any of these products?"
             return response
@@ -140,180 +270,235 @@ class ChatbotService:
             logger.error(f"Error handling product query: {e}")
             return "I'm having trouble searching for products right now. Please try again in a moment."
     
+    async def _stream_product_query(self, message: str, context: dict = None):
+        """Stream product matches one line per product"""
+        search_terms = self._product_search_terms(message)
+        yield f"Searching products for '{' '.join(search_terms)}':\n\n"
+        try:
+            products = await search_products(self.repos, search_terms[:3], limit=5, projection=projection("chatbot_product_search"))
+            
+            if not products:
+                yield f"I couldn't find any products matching '{' '.join(search_terms)}'. Try different keywords or browse our categories."
+                return
+            
+            session_contexts.remember(context, "product", products[0])
+            for product in products:
+                yield self._format_product_line(product)
+            
+            yield "\nWould you like more details about any of these products?"
+        
+        except Exception as e:
+            logger.error(f"Error streaming product query: {e}")
+            yield "I'm having trouble searching for products right now. Please try again in a moment."
+    
+    def _product_search_terms(self, message: str):
+        """Extract potential product keywords"""
+        words = message.lower().split()
+        return [word for word in words if len(word) > 3 and word not in ['product', 'item', 'search', 'find', 'looking', 'want']]
+    
+    def _format_product_line(self, product: dict) -> str:
+        name = product.get('name', 'Unknown')
+        brand = product.get('brand', 'Unknown')
+        price = product.get('retail_price', 0)
+        category = product.get('category', 'Unknown')
+        
+        return f"• {name} by {brand} - ${price:.2f} ({category})\n"
+    
+    def _chat_doc(self, session_id: str, user_message: str, bot_response: str, user_id: int = None) -> dict:
+        """Chat history document for one interaction"""
+        return {
+            "session_id": session_id,
+            "user_message": user_message,
+            "bot_response": bot_response,
+            "timestamp": datetime.utcnow(),
+            "user_id": user_id
+        }
+    
     async def _save_chat_history(self, session_id: str, user_message: str, bot_response: str, user_id: int = None):
         """Save chat interaction to database"""
         try:
-            chat_collection = self.db.chat_messages
-            chat_doc = {
-                "session_id": session_id,
-                "user_message": user_message,
-                "bot_response": bot_response,
-                "timestamp": datetime.utcnow(),
-                "user_id": user_id
-            }
-            await chat_collection.insert_one(chat_doc)
+            chat_doc = self._chat_doc(session_id, user_message, bot_response, user_id)
+            await self.history.add([chat_doc])
+        except Exception as e:
+            logger.error(f"Error saving chat history: {e}")
+    
+    async def _save_chat_history_many(self, chat_docs):
+        """Save several chat interactions with one bulk insert"""
+        try:
+            await self.history.add(chat_docs)
         except Exception as e:
             logger.error(f"Error saving chat history: {e}")
 
-    async def _handle_id_based_query(self, message: str) -> str:
+    async def _handle_id_based_query(self, entities, context: dict = None) -> str:
         """Handle specific ID-based queries like 'inventory_id:67971' or 'product_id:123'"""
         try:
-            # Pattern to match various ID formats
-            patterns = [
-                r'inventory_id[:\s]+([0-9]+)',
-                r'inventory[\s_]item[\s_]id[:\s]+([0-9]+)',
-                r'product_id[:\s]+([0-9]+)',
-                r'order_id[:\s]+([0-9]+)',
-                r'user_id[:\s]+([0-9]+)',
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, message.lower())
-                if match:
-                    id_value = int(match.group(1))
-                    
-                    if 'inventory' in pattern:
-                        return await self._search_inventory_by_id(id_value)
-                    elif 'product' in pattern:
-                        return await self._search_product_by_id(id_value)
-                    elif 'order' in pattern:
-                        return await self._search_order_by_id(id_value)
-                    elif 'user' in pattern:
-                        return await self._search_user_by_id(id_value)
-            
-            return None  # No ID pattern found
+            if not entities:
+                return None  # No ID pattern found
+            
+            # Entities come ordered by pattern priority
+            entity, id_value = entities[0]
+            
+            if entity == 'inventory':
+                return await self._search_inventory_by_id(id_value, context)
+            elif entity == 'product':
+                return await self._search_product_by_id(id_value, context)
+            elif entity == 'order':
+                return await self._search_order_by_id(id_value, context)
+            elif entity == 'user':
+                return await self._search_user_by_id(id_value, context)
             
         except Exception as e:
             logger.error(f"Error handling ID-based query: {e}")
             return "I encountered an error while searching for that ID. Please try again."
     
-    async def _search_inventory_by_id(self, inventory_id: int) -> str:
+    async def _search_inventory_by_id(self, inventory_id: int, context: dict = None) -> str:
         """Search for inventory item by inventory_id"""
         try:
-            inventory_collection = self.db.inventory_items
-            item = await inventory_collection.find_one({"inventory_id": inventory_id})
+            item = await lookup_cache.get_or_load(
+                "inventory", inventory_id, lambda: self.repos.inventory.get(inventory_id, projection("inventory_by_id"))
+            )
             
             if not item:
                 return f"I couldn't find any inventory item with ID {inventory_id}. Please check the ID and try again."
             
-            # Format the response with inventory details
-            response = f"📦 **Inventory Item #{inventory_id}**\n\n"
-            response += f"• **Product**: {item.get('product_name', 'N/A')} by {item.get('product_brand', 'N/A')}\n"
-            response += f"• **Category**: {item.get('product_category', 'N/A')}\n"
-            response += f"• **Department**: {item.get('product_department', 'N/A')}\n"
-            response += f"• **SKU**: {item.get('product_sku', 'N/A')}\n"
-            response += f"• **Cost**: ${item.get('cost', 0):.2f}\n"
-            response += f"• **Retail Price**: ${item.get('product_retail_price', 0):.2f}\n"
-            response += f"• **Product ID**: {item.get('product_id', 'N/A')}\n"
-            response += f"• **Distribution Center**: {item.get('product_distribution_center_id', 'N/A')}\n"
-            
-            if item.get('sold_at'):
-                response += f"• **Status**: Sold on {item.get('sold_at')}\n"
-            else:
-                response += f"• **Status**: Available\n"
-            
-            response += f"• **Created**: {item.get('created_at', 'N/A')}\n"
-            
-            return response
+            session_contexts.remember(context, "inventory", item)
+            return self._format_inventory(item)
             
         except Exception as e:
             logger.error(f"Error searching inventory by ID: {e}")
             return f"I encountered an error while searching for inventory item {inventory_id}. Please try again."
     
-    async def _search_product_by_id(self, product_id: int) -> str:
+    def _format_inventory(self, item: dict) -> str:
+        """Format the response with inventory details"""
+        response = f"📦 **Inventory Item #{item.get('inventory_id', 'N/A')}**\n\n"
+        response += f"• **Product**: {item.get('product_name', 'N/A')} by {item.get('product_brand', 'N/A')}\n"
+        response += f"• **Category**: {item.get('product_category', 'N/A')}\n"
+        response += f"• **Department**: {item.get('product_department', 'N/A')}\n"
+        response += f"• **SKU**: {item.get('product_sku', 'N/A')}\n"
+        response += f"• **Cost**: ${item.get('cost', 0):.2f}\n"
+        response += f"• **Retail Price**: ${item.get('product_retail_price', 0):.2f}\n"
+        response += f"• **Product ID**: {item.get('product_id', 'N/A')}\n"
+        response += f"• **Distribution Center**: {item.get('product_distribution_center_id', 'N/A')}\n"
+        
+        if item.get('sold_at'):
+            response += f"• **Status**: Sold on {item.get('sold_at')}\n"
+        else:
+            response += f"• **Status**: Available\n"
+        
+        response += f"• **Created**: {item.get('created_at', 'N/A')}\n"
+        
+        return response
+    
+    async def _search_product_by_id(self, product_id: int, context: dict = None) -> str:
         """Search for product by product_id"""
         try:
-            products_collection = self.db.products
-            product = await products_collection.find_one({"product_id": product_id})
+            product = await lookup_cache.get_or_load(
+                "product", product_id, lambda: self.repos.products.get(product_id, projection("product_by_id"))
+            )
             
             if not product:
                 return f"I couldn't find any product with ID {product_id}. Please check the ID and try again."
             
-            response = f"🛍️ **Product #{product_id}**\n\n"
-            response += f"• **Name**: {product.get('name', 'N/A')}\n"
-            response += f"• **Brand**: {product.get('brand', 'N/A')}\n"
-            response += f"• **Category**: {product.get('category', 'N/A')}\n"
-            response += f"• **Department**: {product.get('department', 'N/A')}\n"
-            response += f"• **Cost**: ${product.get('cost', 0):.2f}\n"
-            response += f"• **Retail Price**: ${product.get('retail_price', 0):.2f}\n"
-            response += f"• **SKU**: {product.get('sku', 'N/A')}\n"
-            response += f"• **Distribution Center**: {product.get('distribution_center_id', 'N/A')}\n"
-            
-            return response
+            session_contexts.remember(context, "product", product)
+            return self._format_product(product)
             
         except Exception as e:
             logger.error(f"Error searching product by ID: {e}")
             return f"I encountered an error while searching for product {product_id}. Please try again."
     
-    async def _search_order_by_id(self, order_id: int) -> str:
+    def _format_product(self, product: dict) -> str:
+        """Format the response with product details"""
+        response = f"🛍️ **Product #{product.get('product_id', 'N/A')}**\n\n"
+        response += f"• **Name**: {product.get('name', 'N/A')}\n"
+        response += f"• **Brand**: {product.get('brand', 'N/A')}\n"
+        response += f"• **Category**: {product.get('category', 'N/A')}\n"
+        response += f"• **Department**: {product.get('department', 'N/A')}\n"
+        response += f"• **Cost**: ${product.get('cost', 0):.2f}\n"
+        response += f"• **Retail Price**: ${product.get('retail_price', 0):.2f}\n"
+        response += f"• **SKU**: {product.get('sku', 'N/A')}\n"
+        response += f"• **Distribution Center**: {product.get('distribution_center_id', 'N/A')}\n"
+        
+        return response
+    
+    async def _search_order_by_id(self, order_id: int, context: dict = None) -> str:
         """Search for order by order_id"""
         try:
-            orders_collection = self.db.orders
-            order = await orders_collection.find_one({"order_id": order_id})
+            order = await lookup_cache.get_or_load(
+                "order", order_id, lambda: self.repos.orders.get(order_id, projection("order_by_id"))
+            )
             
             if not order:
                 return f"I couldn't find any order with ID {order_id}. Please check the ID and try again."
             
-            response = f"📋 **Order #{order_id}**\n\n"
-            response += f"• **Status**: {order.get('status', 'N/A')}\n"
-            response += f"• **User ID**: {order.get('user_id', 'N/A')}\n"
-            response += f"• **Items**: {order.get('num_of_item', 0)} item(s)\n"
-            response += f"• **Created**: {order.get('created_at', 'N/A')}\n"
-            
-            if order.get('shipped_at'):
-                response += f"• **Shipped**: {order.get('shipped_at')}\n"
-            if order.get('delivered_at'):
-                response += f"• **Delivered**: {order.get('delivered_at')}\n"
-            if order.get('returned_at'):
-                response += f"• **Returned**: {order.get('returned_at')}\n"
-            
-            return response
+            session_contexts.remember(context, "order", order)
+            return self._format_order(order)
             
         except Exception as e:
             logger.error(f"Error searching order by ID: {e}")
             return f"I encountered an error while searching for order {order_id}. Please try again."
     
-    async def _search_user_by_id(self, user_id: int) -> str:
+    def _format_order(self, order: dict) -> str:
+        """Format the response with order details"""
+        response = f"📋 **Order #{order.get('order_id', 'N/A')}**\n\n"
+        response += f"• **Status**: {order.get('status', 'N/A')}\n"
+        response += f"• **User ID**: {order.get('user_id', 'N/A')}\n"
+        response += f"• **Items**: {order.get('num_of_item', 0)} item(s)\n"
+        response += f"• **Created**: {order.get('created_at', 'N/A')}\n"
+        
+        if order.get('shipped_at'):
+            response += f"• **Shipped**: {order.get('shipped_at')}\n"
+        if order.get('delivered_at'):
+            response += f"• **Delivered**: {order.get('delivered_at')}\n"
+        if order.get('returned_at'):
+            response += f"• **Returned**: {order.get('returned_at')}\n"
+        
+        return response
+    
+    async def _search_user_by_id(self, user_id: int, context: dict = None) -> str:
         """Search for user by user_id"""
         try:
-            users_collection = self.db.users
-            user = await users_collection.find_one({"user_id": user_id})
+            user = await lookup_cache.get_or_load(
+                "user", user_id, lambda: self.repos.users.get(user_id, projection("user_by_id"))
+            )
             
             if not user:
                 return f"I couldn't find any user with ID {user_id}. Please check the ID and try again."
             
-            response = f"👤 **User #{user_id}**\n\n"
-            response += f"• **Name**: {user.get('first_name', '')} {user.get('last_name', '')}\n"
-            response += f"• **Email**: {user.get('email', 'N/A')}\n"
-            response += f"• **Age**: {user.get('age', 'N/A')}\n"
-            response += f"• **Gender**: {user.get('gender', 'N/A')}\n"
-            response += f"• **Location**: {user.get('city', 'N/A')}, {user.get('state', 'N/A')}\n"
-            response += f"• **Country**: {user.get('country', 'N/A')}\n"
-            response += f"• **Traffic Source**: {user.get('traffic_source', 'N/A')}\n"
-            response += f"• **Created**: {user.get('created_at', 'N/A')}\n"
-            
-            return response
+            session_contexts.remember(context, "user", user)
+            return self._format_user(user)
             
         except Exception as e:
             logger.error(f"Error searching user by ID: {e}")
             return f"I encountered an error while searching for user {user_id}. Please try again."
     
+    def _format_user(self, user: dict) -> str:
+        """Format the response with user details"""
+        response = f"👤 **User #{user.get('user_id', 'N/A')}**\n\n"
+        response += f"• **Name**: {user.get('first_name', '')} {user.get('last_name', '')}\n"
+        response += f"• **Email**: {user.get('email', 'N/A')}\n"
+        response += f"• **Age**: {user.get('age', 'N/A')}\n"
+        response += f"• **Gender**: {user.get('gender', 'N/A')}\n"
+        response += f"• **Location**: {user.get('city', 'N/A')}, {user.get('state', 'N/A')}\n"
+        response += f"• **Country**: {user.get('country', 'N/A')}\n"
+        response += f"• **Traffic Source**: {user.get('traffic_source', 'N/A')}\n"
+        response += f"• **Created**: {user.get('created_at', 'N/A')}\n"
+        
+        return response
+    
     async def _handle_inventory_query(self, message: str) -> str:
         """Handle general inventory queries"""
         try:
             # Check if it's a specific search query
             if any(word in message.lower() for word in ['search', 'find', 'show', 'get']):
-                inventory_collection = self.db.inventory_items
-                
                 # Get some sample inventory items
-                items = await inventory_collection.find({}).limit(5).to_list(length=5)
+                items = await self.repos.inventory.sample(limit=5, projection=projection("inventory_sample"))
                 
                 if not items:
                     return "I couldn't find any inventory items in the database. The inventory might be empty or still loading."
                 
                 response = "📦 **Sample Inventory Items:**\n\n"
                 for item in items:
-                    response += f"• **ID {item.get('inventory_id')}**: {item.get('product_name', 'N/A')} - ${item.get('product_retail_price', 0):.2f}\n"
+                    response += self._format_inventory_sample_line(item)
                 
                 response += "\n💡 **Tip**: You can search for specific items by asking:\n"
                 response += "• \"inventory_id:67971\" - to find a specific inventory item\n"
@@ -327,15 +512,23 @@ class ChatbotService:
             logger.error(f"Error handling inventory query: {e}")
             return "I'm having trouble accessing inventory information right now. Please try again in a moment."
     
-    async def get_chat_history(self, session_id: str, limit: int = 10):
-        """Get chat history for a session"""
+    def _format_inventory_sample_line(self, item: dict) -> str:
+        return f"• **ID {item.get('inventory_id')}**: {item.get('product_name', 'N/A')} - ${item.get('product_retail_price', 0):.2f}\n"
+    
+    async def get_chat_history(self, session_id: str, limit: int = 10, cursor: str = None):
+        """Get a page of chat history for a session, and the cursor of the next (older) page"""
         try:
-            chat_collection = self.db.chat_messages
-            history = await chat_collection.find(
-                {"session_id": session_id}
-            ).sort("timestamp", -1).limit(limit).to_list(length=limit)
-            
-            return list(reversed(history))  # Return in chronological order
+            # Make buffered messages visible before reading
+            if self.history and not cursor:
+                await self.history.flush()
+            
+            history, next_cursor = await self.repos.chat_history.page_for_session(
+                session_id, cursor=cursor, limit=limit, projection=projection("chat_history")
+            )
+            history.reverse()  # Return in chronological order
+            return history, next_cursor
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"Error getting chat history: {e}")
-            return []
+            return [], None
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Check how the lookup cache's coalesced loads behave when the request
+doing the load fails or goes away.  Requests waiting on a shared load
+must always finish: with the document when the loading request was
+cancelled, with its error when the load raised.  Exits non-zero on a
+failure, so it can run in CI.
+"""
+import asyncio
+import sys
+
+from lookup_cache import LookupCache
+
+# Longer than any of the checks should take
+TIMEOUT_SECONDS = 2
+
+
+async def leader_cancelled():
+    """Waiters finish with the document after the loading request is cancelled"""
+    cache = LookupCache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"product_id": 1}
+
+    leader = asyncio.create_task(cache.get_or_load("product", 1, loader))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(cache.get_or_load("product", 1, loader)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    results = await asyncio.wait_for(asyncio.gather(*waiters), TIMEOUT_SECONDS)
+    assert leader.cancelled(), "the loading request was not cancelled"
+    assert results == [{"product_id": 1}] * 3, f"waiters returned {results}"
+    # One waiter took over the load and the others shared it
+    assert calls == 2, f"loader called {calls} times, expected 2"
+    assert not cache.pending, "a load was left pending"
+
+
+async def leader_failed():
+    """Waiters re-raise the loading request's error"""
+    cache = LookupCache()
+
+    async def loader():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("database unavailable")
+
+    tasks = [asyncio.create_task(cache.get_or_load("order", 7, loader)) for _ in range(3)]
+    results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), TIMEOUT_SECONDS)
+    assert all(isinstance(result, RuntimeError) for result in results), f"results were {results}"
+    assert not cache.pending, "a load was left pending"
+
+
+async def waiter_cancelled():
+    """A cancelled waiter does not disturb the load it was waiting on"""
+    cache = LookupCache()
+
+    async def loader():
+        await asyncio.sleep(0.02)
+        return {"user_id": 3}
+
+    leader = asyncio.create_task(cache.get_or_load("user", 3, loader))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(cache.get_or_load("user", 3, loader))
+    await asyncio.sleep(0.005)
+    waiter.cancel()
+
+    assert await asyncio.wait_for(leader, TIMEOUT_SECONDS) == {"user_id": 3}
+    assert waiter.cancelled(), "the cancelled waiter finished"
+    assert cache.stats()["entries"] == 1, "the loaded document was not cached"
+
+
+CHECKS = [leader_cancelled, leader_failed, waiter_cancelled]
+
+
+def main():
+    failures = 0
+    for check in CHECKS:
+        try:
+            asyncio.run(check())
+        except (AssertionError, asyncio.TimeoutError) as e:
+            failures += 1
+            print(f"❌ {check.__name__}: {str(e) or 'timed out'}")
+    if failures:
+        sys.exit(1)
+    print(f"✅ {len(CHECKS)} lookup cache checks passed")
+
+
+if __name__ == "__main__":
+    main()
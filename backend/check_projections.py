@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Check that every formatter only reads fields its query's projection
+returns.  Each formatter is run on a document holding exactly the
+projected fields, and any other field it looks up is reported.  Every
+``ChatbotService._format_*`` method must have an entry in
+``FORMATTER_QUERIES``, so a new formatter cannot go unchecked.  Exits
+non-zero on a violation, so it can run in CI.
+"""
+import sys
+
+from autocomplete import AutocompleteIndex
+from chatbot_service import ChatbotService
+from product_search import ProductSearchIndex
+from projections import QUERY_FIELDS
+
+service = ChatbotService()
+
+# ChatbotService formatter -> queries whose documents it renders
+FORMATTER_QUERIES = {
+    "_format_inventory": ["inventory_by_id"],
+    "_format_product": ["product_by_id", "chatbot_product_search"],
+    "_format_order": ["order_by_id", "recent_orders"],
+    "_format_user": ["user_by_id"],
+    "_format_order_line": ["recent_orders"],
+    "_format_product_line": ["chatbot_product_search"],
+    "_format_inventory_sample_line": ["inventory_sample"],
+}
+
+# Readers of product documents outside ChatbotService
+CHECKS = [
+    ("AutocompleteIndex.build_from", lambda doc: AutocompleteIndex().build_from([doc]), ["product_catalog"]),
+    ("ProductSearchIndex.build_from", lambda doc: ProductSearchIndex().build_from([doc]), ["product_catalog"]),
+]
+
+
+class RecordingDocument(dict):
+    """A document that remembers every field looked up on it"""
+
+    def __init__(self, fields):
+        # Numbers render under every format spec the formatters use
+        super().__init__({field: 1.0 for field in fields}, _id="0" * 24)
+        self.read = set()
+
+    def get(self, key, default=None):
+        self.read.add(key)
+        return super().get(key, default)
+
+    def __getitem__(self, key):
+        self.read.add(key)
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        self.read.add(key)
+        return super().__contains__(key)
+
+
+def formatter_checks():
+    """(name, formatter, queries) for every ChatbotService formatter, and the formatters without an entry"""
+    formatters = sorted(name for name in dir(ChatbotService) if name.startswith("_format_"))
+    unlisted = [name for name in formatters if name not in FORMATTER_QUERIES]
+    unknown = [name for name in FORMATTER_QUERIES if name not in formatters]
+    checks = [(name, getattr(service, name), FORMATTER_QUERIES[name]) for name in formatters if name in FORMATTER_QUERIES]
+    return checks, unlisted, unknown
+
+
+def main():
+    checks, unlisted, unknown = formatter_checks()
+    checks += CHECKS
+    failures = [f"{name} has no entry in FORMATTER_QUERIES" for name in unlisted]
+    failures += [f"FORMATTER_QUERIES lists {name}, which ChatbotService does not have" for name in unknown]
+    for name, formatter, queries in checks:
+        for query in queries:
+            document = RecordingDocument(QUERY_FIELDS[query])
+            formatter(document)
+            missing = sorted(document.read - set(document))
+            if missing:
+                failures.append(f"{name} reads {missing} not projected by '{query}'")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print(f"✅ {sum(len(queries) for _, _, queries in checks)} formatter/projection pairs checked")
+
+
+if __name__ == "__main__":
+    main()
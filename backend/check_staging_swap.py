@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Check that a staging reload never exposes a half-loaded collection.
+Readers query the live collection in a loop while a new version is
+loaded into staging and renamed over it with ``swap_in_async``; every
+read must see either the complete old collection or the complete new
+one.  Exits non-zero on a violation, so it can run in CI.
+
+Runs against mongomock-motor by default, or a real server:
+
+    python check_staging_swap.py
+    python check_staging_swap.py --mongodb-url mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import sys
+
+from staging_swap import staging_collection_async, swap_in_async
+
+COLLECTION = "orders"
+OLD_ROWS = 60
+NEW_ROWS = 90
+READERS = 8
+# Below MongoDB's default batch size too, so each read is one round trip
+BATCH_SIZE = 1000
+
+
+def orders(version, rows):
+    return [{"order_id": order_id, "user_id": order_id % 7, "version": version} for order_id in range(1, rows + 1)]
+
+
+async def reader(collection, done, seen):
+    """Read the whole live collection until the swap is over, recording each version mix seen"""
+    while not done.is_set():
+        documents = await collection.find({}, {"version": 1}).batch_size(BATCH_SIZE).to_list(None)
+        seen.append((len(documents), frozenset(document["version"] for document in documents)))
+        await asyncio.sleep(0)
+
+
+async def reload(db, insert_batch=10):
+    """Load the new version into staging in small batches, then swap it in"""
+    staging = await staging_collection_async(db, COLLECTION)
+    documents = orders(2, NEW_ROWS)
+    for start in range(0, len(documents), insert_batch):
+        await staging.insert_many(documents[start:start + insert_batch])
+        # Let the readers in between batches
+        await asyncio.sleep(0.001)
+    return await swap_in_async(db, COLLECTION, len(documents))
+
+
+async def check(db):
+    await db[COLLECTION].drop()
+    await db[COLLECTION].insert_many(orders(1, OLD_ROWS))
+
+    done = asyncio.Event()
+    seen = []
+    readers = [asyncio.create_task(reader(db[COLLECTION], done, seen)) for _ in range(READERS)]
+    await asyncio.sleep(0.01)
+    swapped = await reload(db)
+    await asyncio.sleep(0.01)
+    done.set()
+    await asyncio.gather(*readers)
+
+    complete = {(OLD_ROWS, frozenset({1})), (NEW_ROWS, frozenset({2}))}
+    partial = [(count, sorted(versions)) for count, versions in seen if (count, versions) not in complete]
+    old_reads = sum(1 for read in seen if read == (OLD_ROWS, frozenset({1})))
+    new_reads = sum(1 for read in seen if read == (NEW_ROWS, frozenset({2})))
+
+    failures = []
+    if not swapped:
+        failures.append("swap_in_async reported a failure")
+    if partial:
+        failures.append(f"{len(partial)} reads saw a partial collection, e.g. {partial[:3]}")
+    if not old_reads or not new_reads:
+        failures.append(f"reads did not span the swap ({old_reads} old, {new_reads} new)")
+    return failures, len(seen), old_reads, new_reads
+
+
+def connect(mongodb_url, database_name):
+    if mongodb_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient(mongodb_url)[database_name]
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("mongomock-motor is not installed; pass --mongodb-url to check against a server")
+    return AsyncMongoMockClient()[database_name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongodb-url", help="MongoDB server to check against (default: mongomock-motor)")
+    parser.add_argument("--database", default="staging_swap_check", help="Scratch database the check overwrites")
+    args = parser.parse_args()
+
+    from database import DATABASE_NAME
+    if args.database == DATABASE_NAME:
+        sys.exit(f"Refusing to run against the application database {DATABASE_NAME!r}; pick a scratch --database")
+
+    async def run():
+        db = connect(args.mongodb_url, args.database)
+        try:
+            return await check(db)
+        finally:
+            await db[COLLECTION].drop()
+
+    failures, reads, old_reads, new_reads = asyncio.run(run())
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"✅ {reads} concurrent reads ({old_reads} old, {new_reads} new) all saw a complete collection")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Notifications that a collection has been reloaded.
+
+The loaders run as separate scripts, so after every successful staging
+swap or incremental sync they stamp the collection in ``data_versions``.
+The API polls that collection from a background task and runs the
+listeners registered for the changed collections (in-memory index
+rebuilds, cache invalidation).  In-process callers can fire the
+listeners directly with ``reload_watcher.notify``.
+"""
+import asyncio
+import inspect
+import logging
+import os
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_COLLECTION = "data_versions"
+POLL_INTERVAL_SECONDS = int(os.getenv("RELOAD_POLL_SECONDS", "30"))
+
+
+def mark_reloaded(db, collection_name):
+    """Record that a collection was reloaded (pymongo)"""
+    db[VERSIONS_COLLECTION].update_one(
+        {"_id": collection_name},
+        {"$set": {"reloaded_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+async def mark_reloaded_async(db, collection_name):
+    """Record that a collection was reloaded (Motor)"""
+    await db[VERSIONS_COLLECTION].update_one(
+        {"_id": collection_name},
+        {"$set": {"reloaded_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+class ReloadWatcher:
+    def __init__(self, poll_interval=POLL_INTERVAL_SECONDS):
+        self.poll_interval = poll_interval
+        self.listeners = []
+        self.versions = {}
+        self.task = None
+
+    def subscribe(self, collection_names, callback):
+        """Call callback(changed_names) when any of the collections is reloaded.
+
+        ``collection_names=None`` subscribes to every collection; the
+        callback may be a plain function or a coroutine function.
+        """
+        names = set(collection_names) if collection_names is not None else None
+        self.listeners.append((names, callback))
+
+    async def notify(self, collection_names):
+        """Run the listeners interested in the given collections"""
+        changed = set(collection_names)
+        for names, callback in self.listeners:
+            if names is not None and not names & changed:
+                continue
+            try:
+                result = callback(sorted(changed))
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Error in reload listener {getattr(callback, '__name__', callback)}: {e}")
+
+    async def check(self, db):
+        """Compare the stored stamps with the last ones seen and notify on changes"""
+        documents = await db[VERSIONS_COLLECTION].find({}).to_list(length=None)
+        current = {doc["_id"]: doc.get("reloaded_at") for doc in documents}
+        changed = [name for name, stamp in current.items() if self.versions.get(name) != stamp]
+        self.versions = current
+        if changed:
+            logger.info(f"Reload detected for: {', '.join(sorted(changed))}")
+            await self.notify(changed)
+        return changed
+
+    async def _poll(self, db):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.check(db)
+            except Exception as e:
+                logger.error(f"Error checking data versions: {e}")
+
+    async def start(self, db):
+        """Record the current stamps and start polling"""
+        try:
+            documents = await db[VERSIONS_COLLECTION].find({}).to_list(length=None)
+            self.versions = {doc["_id"]: doc.get("reloaded_at") for doc in documents}
+        except Exception as e:
+            logger.error(f"Error reading data versions: {e}")
+        self.task = asyncio.create_task(self._poll(db))
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+# Shared instance, started in the FastAPI lifespan hook
+reload_watcher = ReloadWatcher()
@@ -0,0 +1,56 @@
+"""
+Collection counts for ``/data/stats``.
+
+Dashboards poll the endpoint, so the six counts are issued concurrently,
+use the metadata-based ``estimated_document_count`` on MongoDB unless an
+exact count is asked for, and are cached for ``STATS_TTL_SECONDS``.  Concurrent
+requests on an expired entry share one refresh, and a reload of any
+counted collection drops the cached counts.
+"""
+import asyncio
+import time
+from datetime import datetime
+
+STATS_COLLECTIONS = [
+    "distribution_centers", "products", "users",
+    "orders", "inventory_items", "order_items"
+]
+
+STATS_TTL_SECONDS = 10
+
+
+class DataStatsCache:
+    def __init__(self, collections=STATS_COLLECTIONS, ttl=STATS_TTL_SECONDS):
+        self.collections = collections
+        self.ttl = ttl
+        self.entries = {}
+        self.locks = {True: asyncio.Lock(), False: asyncio.Lock()}
+
+    async def _count(self, repositories, exact):
+        counts = await asyncio.gather(*(repositories.count(name, exact) for name in self.collections))
+        return dict(zip(self.collections, counts))
+
+    async def get(self, repositories, exact=False):
+        """(counts, computed_at), recomputed when older than the TTL"""
+        entry = self.entries.get(exact)
+        if entry and entry[0] > time.monotonic():
+            return entry[1], entry[2]
+
+        async with self.locks[exact]:
+            # Another request may have refreshed while this one waited
+            entry = self.entries.get(exact)
+            if entry and entry[0] > time.monotonic():
+                return entry[1], entry[2]
+
+            counts = await self._count(repositories, exact)
+            computed_at = datetime.utcnow()
+            self.entries[exact] = (time.monotonic() + self.ttl, counts, computed_at)
+            return counts, computed_at
+
+    def invalidate(self, collection_names=None):
+        if collection_names is None or set(collection_names) & set(self.collections):
+            self.entries.clear()
+
+
+# Shared instance used by /data/stats
+data_stats = DataStatsCache()
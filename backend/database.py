@@ -3,6 +3,8 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo import MongoClient
 from dotenv import load_dotenv
 
+from query_monitor import query_monitor
+
 load_dotenv()
 
 # Direct MongoDB Atlas connection
@@ -18,7 +20,7 @@ db = Database()
 
 async def connect_to_mongo():
     """Create database connection"""
-    db.client = AsyncIOMotorClient(MONGODB_URL)
+    db.client = AsyncIOMotorClient(MONGODB_URL, event_listeners=[query_monitor])
     db.database = db.client[DATABASE_NAME]
     print(f"Connected to MongoDB at {MONGODB_URL}")
 
@@ -35,5 +37,5 @@ def get_database():
 # Sync client for data population scripts
 def get_sync_database():
     """Get synchronous database connection for data population"""
-    client = MongoClient(MONGODB_URL)
+    client = MongoClient(MONGODB_URL, event_listeners=[query_monitor])
     return client[DATABASE_NAME]
@@ -0,0 +1,264 @@
+"""
+Column-wise conversion of CSV DataFrames into MongoDB documents.
+
+Every loader used to walk ``df.iterrows()`` and cast each cell with
+``int()``/``float()``/``str()``.  Here each column is cast once with a
+pandas dtype and the documents are materialized in bulk from the
+resulting column lists.
+"""
+import hashlib
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+
+# (document field, CSV column, kind) for every collection we load.
+# "datetime_required" columns fall back to the load time when missing.
+COLLECTION_SCHEMAS = {
+    "distribution_centers": [
+        ("center_id", "id", "int"),
+        ("name", "name", "str"),
+        ("latitude", "latitude", "float"),
+        ("longitude", "longitude", "float"),
+    ],
+    "products": [
+        ("product_id", "id", "int"),
+        ("cost", "cost", "float"),
+        ("category", "category", "str"),
+        ("name", "name", "str"),
+        ("brand", "brand", "str"),
+        ("retail_price", "retail_price", "float"),
+        ("department", "department", "str"),
+        ("sku", "sku", "str"),
+        ("distribution_center_id", "distribution_center_id", "int"),
+    ],
+    "users": [
+        ("user_id", "id", "int"),
+        ("first_name", "first_name", "str"),
+        ("last_name", "last_name", "str"),
+        ("email", "email", "str"),
+        ("age", "age", "int"),
+        ("gender", "gender", "str"),
+        ("state", "state", "str"),
+        ("street_address", "street_address", "str"),
+        ("postal_code", "postal_code", "str"),
+        ("city", "city", "str"),
+        ("country", "country", "str"),
+        ("latitude", "latitude", "float"),
+        ("longitude", "longitude", "float"),
+        ("traffic_source", "traffic_source", "str"),
+        ("created_at", "created_at", "datetime_required"),
+    ],
+    "orders": [
+        ("order_id", "order_id", "int"),
+        ("user_id", "user_id", "int"),
+        ("status", "status", "str"),
+        ("gender", "gender", "str"),
+        ("created_at", "created_at", "datetime_required"),
+        ("returned_at", "returned_at", "datetime"),
+        ("shipped_at", "shipped_at", "datetime"),
+        ("delivered_at", "delivered_at", "datetime"),
+        ("num_of_item", "num_of_item", "int"),
+    ],
+    "inventory_items": [
+        ("inventory_id", "id", "int"),
+        ("product_id", "product_id", "int"),
+        ("created_at", "created_at", "datetime_required"),
+        ("sold_at", "sold_at", "datetime"),
+        ("cost", "cost", "float"),
+        ("product_category", "product_category", "str"),
+        ("product_name", "product_name", "str"),
+        ("product_brand", "product_brand", "str"),
+        ("product_retail_price", "product_retail_price", "float"),
+        ("product_department", "product_department", "str"),
+        ("product_sku", "product_sku", "str"),
+        ("product_distribution_center_id", "product_distribution_center_id", "int"),
+    ],
+    "order_items": [
+        ("item_id", "id", "int"),
+        ("order_id", "order_id", "int"),
+        ("user_id", "user_id", "int"),
+        ("product_id", "product_id", "int"),
+        ("inventory_item_id", "inventory_item_id", "int"),
+        ("status", "status", "str"),
+        ("created_at", "created_at", "datetime_required"),
+        ("shipped_at", "shipped_at", "datetime"),
+        ("delivered_at", "delivered_at", "datetime"),
+        ("returned_at", "returned_at", "datetime"),
+    ],
+}
+
+# Natural ID of each collection, used for upserts and unique indexes
+NATURAL_KEYS = {
+    "distribution_centers": "center_id",
+    "products": "product_id",
+    "users": "user_id",
+    "orders": "order_id",
+    "inventory_items": "inventory_id",
+    "order_items": "item_id",
+}
+
+# Per-row hash of the CSV content, stored alongside each document so
+# incremental loads can skip unchanged rows
+CONTENT_HASH_FIELD = "_content_hash"
+
+
+# Explicit-format fast path: "YYYY-MM-DD HH:MM:SS" (or "T"), optionally
+# followed by "Z" or "+00:00", checked byte-wise on fixed-width strings.
+_FAST_WIDTH = 26
+_DIGIT_POSITIONS = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+_SEPARATORS = {4: b"-", 7: b"-", 13: b":", 16: b":"}
+_DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+_UTC_SUFFIXES = [
+    np.frombuffer(suffix.ljust(_FAST_WIDTH - 19, b"\0"), dtype=np.uint8)
+    for suffix in (b"", b"Z", b"+00:00")
+]
+
+
+def _parse_fast(values):
+    """Parse the values matching the explicit format.
+
+    Returns (datetime64[us], matched mask, ASCII mask); values with other
+    characters are never matched.
+    """
+    parsed = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[us]")
+    # Code points rather than bytes, so a non-ASCII value only fails its own row
+    codes = values.astype(f"U{_FAST_WIDTH}").view(np.uint32).reshape(-1, _FAST_WIDTH)
+    ascii_rows = (codes < 128).all(axis=1)
+    chars = codes.astype(np.uint8)
+    head, suffix = chars[:, :19], chars[:, 19:]
+
+    matched = np.zeros(len(values), dtype=bool)
+    for utc_suffix in _UTC_SUFFIXES:
+        matched |= (suffix == utc_suffix).all(axis=1)
+    matched &= ascii_rows
+    digits = head[:, _DIGIT_POSITIONS]
+    matched &= ((digits >= ord("0")) & (digits <= ord("9"))).all(axis=1)
+    for position, separator in _SEPARATORS.items():
+        matched &= head[:, position] == ord(separator)
+    matched &= (head[:, 10] == ord(" ")) | (head[:, 10] == ord("T"))
+
+    # Well-formed but impossible values (month 13, Feb 30, hour 25...) go to
+    # the fallback: numpy 1.26 crashes instead of raising when casting them
+    # from bytes
+    numbers = (digits[:, 0::2].astype(np.int64) - ord("0")) * 10 + (digits[:, 1::2] - ord("0"))
+    year = numbers[:, 0] * 100 + numbers[:, 1]
+    month, day, hour, minute, second = numbers[:, 2:].T
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = _DAYS_IN_MONTH[np.clip(month, 1, 12) - 1] + ((month == 2) & leap)
+    matched &= (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= month_days)
+    matched &= (hour < 24) & (minute < 60) & (second < 60)
+
+    try:
+        # Through unicode, which raises ValueError rather than crashing on anything missed above
+        text = np.ascontiguousarray(head[matched]).view("S19").ravel().astype("U19")
+        parsed[matched] = text.astype("datetime64[us]")
+    except ValueError:
+        matched[:] = False
+    return parsed, matched, ascii_rows
+
+
+def _parse_iso(value):
+    """The loaders' original per-value parse, as naive UTC (None when invalid)"""
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            # Also takes non-ASCII digits, which fromisoformat does not
+            return datetime.strptime(str(value), "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        try:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        except OverflowError:
+            return None
+    return parsed
+
+
+def parse_datetime_column(series):
+    """Parse a column of timestamp strings into naive UTC datetimes (None where missing)"""
+    present = series.notna().to_numpy()
+    values = series.to_numpy(dtype=object)[present]
+
+    parsed, matched, ascii_rows = _parse_fast(values)
+
+    # Mixed-format inference only for the ASCII rows the fast path rejected
+    failed = np.flatnonzero(~matched & ascii_rows)
+    if len(failed):
+        fallback = pd.to_datetime(
+            pd.Series(values[failed]).astype(str), format="mixed", errors="coerce", utc=True
+        )
+        parsed[failed] = fallback.dt.tz_convert(None).to_numpy(dtype="datetime64[us]")
+    # Non-ASCII rows, and what pandas rejected or could not represent
+    # (it only covers 1677-2262), get the per-value parse
+    retry = np.concatenate([np.flatnonzero(~ascii_rows), failed[np.isnat(parsed[failed])]])
+    for position in retry:
+        value = _parse_iso(values[position])
+        if value is not None:
+            parsed[position] = value
+
+    result = np.full(len(series), None, dtype=object)
+    result[present] = parsed.astype(object)  # NaT becomes None
+    return result.tolist()
+
+
+def parse_datetime_columns(df, columns):
+    """Parse several timestamp columns in a single vectorized pass"""
+    if not columns:
+        return {}
+    stacked = pd.concat([df[column] for column in columns], ignore_index=True)
+    values = parse_datetime_column(stacked)
+    rows = len(df)
+    return {
+        column: values[i * rows:(i + 1) * rows]
+        for i, column in enumerate(columns)
+    }
+
+
+def convert_column(series, kind):
+    """Cast a whole non-timestamp column and return it as a list of native Python values"""
+    if kind == "int":
+        # astype raises on missing values just like int(nan) did
+        return series.astype("int64").tolist()
+    if kind == "float":
+        return series.astype("float64").tolist()
+    if kind == "str":
+        return series.astype(str).tolist()
+    raise ValueError(f"Unknown column kind: {kind}")
+
+
+def _row_hash(values):
+    return hashlib.blake2b(repr(values).encode(), digest_size=16).hexdigest()
+
+
+def build_documents(df, collection_name, content_hash=False):
+    """Convert a DataFrame (or chunk) of CSV rows into documents for a collection"""
+    schema = COLLECTION_SCHEMAS[collection_name]
+    fields = [field for field, _, _ in schema]
+    timestamps = parse_datetime_columns(
+        df, [source for _, source, kind in schema if kind.startswith("datetime")]
+    )
+
+    now = datetime.utcnow()
+    columns = []
+    for _, source, kind in schema:
+        if kind == "datetime":
+            columns.append(timestamps[source])
+        elif kind == "datetime_required":
+            columns.append([value or now for value in timestamps[source]])
+        else:
+            columns.append(convert_column(df[source], kind))
+
+    if content_hash:
+        # Hash the parsed values before the utcnow() fallback so a row with a
+        # missing created_at hashes the same on every load
+        hashed = [
+            timestamps[source] if kind == "datetime_required" else column
+            for (_, source, kind), column in zip(schema, columns)
+        ]
+        fields.append(CONTENT_HASH_FIELD)
+        columns.append([_row_hash(values) for values in zip(*hashed)])
+
+    # Equivalent to to_dict('records') on the converted frame, but zips the
+    # already-native column lists instead of boxing values row by row.
+    return [dict(zip(fields, values)) for values in zip(*columns)]
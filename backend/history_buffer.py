@@ -0,0 +1,151 @@
+"""
+Write-behind persistence of chat history.
+
+In ``buffered`` mode chat documents are appended to an in-memory buffer
+and written with ``insert_many`` by a background task, once
+``flush_size`` documents are waiting or ``flush_interval`` seconds have
+passed, so ``/chat`` no longer waits on a database round trip.  The
+buffer is drained on shutdown.  ``sync`` mode keeps the old behaviour of
+writing every document before responding, for deployments that cannot
+lose the last second of history on a crash.
+
+A batch whose write fails goes back to the front of the buffer and is
+retried by the next flush; documents get their ``_id`` before the first
+attempt so a retry of a partly written batch does not duplicate them.
+Only documents pushed past ``max_buffered`` while writes keep failing,
+or still failing after one retry at shutdown, are dropped (and counted
+as ``failed``).
+"""
+import asyncio
+import logging
+import os
+import time
+
+from bson import ObjectId
+
+from metrics import chat_history_write_duration_seconds
+
+logger = logging.getLogger(__name__)
+
+HISTORY_MODE = os.getenv("CHAT_HISTORY_MODE", "buffered")
+FLUSH_SIZE = int(os.getenv("CHAT_HISTORY_FLUSH_SIZE", "200"))
+FLUSH_INTERVAL_SECONDS = float(os.getenv("CHAT_HISTORY_FLUSH_SECONDS", "1.0"))
+
+# Past this many waiting documents, writers flush inline instead of queueing
+MAX_BUFFERED = 10_000
+
+MODES = ("sync", "buffered")
+
+
+class ChatHistoryWriter:
+    def __init__(self, repository, mode=HISTORY_MODE, flush_size=FLUSH_SIZE,
+                 flush_interval=FLUSH_INTERVAL_SECONDS, max_buffered=MAX_BUFFERED):
+        if mode not in MODES:
+            raise ValueError(f"Unknown chat history mode {mode!r}, expected one of {MODES}")
+        self.repository = repository
+        self.mode = mode
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.buffer = []
+        self.wakeup = asyncio.Event()
+        self.flush_lock = asyncio.Lock()
+        self.task = None
+        self.written = 0
+        self.failed = 0
+
+    @property
+    def buffered(self):
+        return self.mode == "buffered" and self.task is not None
+
+    async def start(self):
+        if self.mode == "buffered" and self.task is None:
+            self.task = asyncio.create_task(self._run())
+            logger.info(f"Chat history write-behind started (flush at {self.flush_size} docs or {self.flush_interval}s)")
+
+    async def add(self, chat_docs):
+        """Persist chat documents now (sync) or queue them for the next flush"""
+        if not chat_docs:
+            return
+        if not self.buffered:
+            await self._write(chat_docs)
+            self.written += len(chat_docs)
+            return
+
+        self.buffer.extend(chat_docs)
+        if len(self.buffer) >= self.max_buffered:
+            # The flusher is falling behind: make this writer wait for it
+            await self.flush()
+        elif len(self.buffer) >= self.flush_size:
+            self.wakeup.set()
+
+    async def flush(self):
+        """Write everything queued so far"""
+        async with self.flush_lock:
+            if not self.buffer:
+                return
+            chat_docs, self.buffer = self.buffer, []
+            try:
+                await self._write(chat_docs)
+                self.written += len(chat_docs)
+            except Exception as e:
+                self._requeue(chat_docs, e)
+
+    def _requeue(self, chat_docs, error):
+        """Put a failed batch back in front of the buffer, dropping the oldest documents past max_buffered"""
+        self.buffer = chat_docs + self.buffer
+        lost = len(self.buffer) - self.max_buffered
+        if lost > 0:
+            del self.buffer[:lost]
+            self.failed += lost
+            logger.error(f"❌ Error writing {len(chat_docs)} chat history documents, "
+                         f"dropped the {lost} oldest past the {self.max_buffered} document cap: {error}")
+        else:
+            logger.error(f"Error writing {len(chat_docs)} chat history documents, requeued for the next flush: {error}")
+
+    async def _write(self, chat_docs):
+        # IDs set once, so retrying a partly written batch is idempotent
+        for chat_doc in chat_docs:
+            chat_doc.setdefault("_id", ObjectId())
+        start = time.perf_counter()
+        try:
+            await self.repository.insert_many(chat_docs)
+        finally:
+            chat_history_write_duration_seconds.labels(self.mode).observe(time.perf_counter() - start)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            # Shielded so stop() cannot cancel a write halfway through
+            await asyncio.shield(self.flush())
+
+    async def stop(self):
+        """Stop the background task and drain the buffer"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+        if self.buffer:
+            # One retry, then give up on what is left
+            await self.flush()
+        if self.buffer:
+            self.failed += len(self.buffer)
+            logger.error(f"❌ Lost {len(self.buffer)} chat history documents at shutdown")
+            self.buffer = []
+        logger.info(f"Chat history writer stopped: {self.written} written, {self.failed} failed")
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "buffered": len(self.buffer),
+            "written": self.written,
+            "failed": self.failed,
+        }
@@ -0,0 +1,121 @@
+"""
+Incremental, upsert-based loading of CSV files.
+
+Instead of ``delete_many({})`` followed by a full reload, rows are keyed
+on their natural ID and written with unordered ``bulk_write`` batches of
+``ReplaceOne(upsert=True)``.  Rows whose content hash matches the one
+stored on the existing document are skipped, and documents whose ID no
+longer appears in the CSV are removed with ``DeleteOne``.  Readers never
+see an empty collection while this runs.
+"""
+import logging
+
+import pandas as pd
+from pymongo import DeleteOne, ReplaceOne
+
+from data_events import mark_reloaded, mark_reloaded_async
+from document_builder import CONTENT_HASH_FIELD, NATURAL_KEYS, build_documents
+from indexes import index_models
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 5000
+BATCH_SIZE = 1000
+
+
+def _iter_documents(file_path, collection_name, chunk_size):
+    for chunk_df in pd.read_csv(file_path, chunksize=chunk_size):
+        yield build_documents(chunk_df, collection_name, content_hash=True)
+
+
+def _batches(operations, batch_size):
+    for i in range(0, len(operations), batch_size):
+        yield operations[i:i + batch_size]
+
+
+def _existing_query(documents, key):
+    """Filter and projection fetching the stored hashes for a chunk's IDs"""
+    return (
+        {key: {"$in": [doc[key] for doc in documents]}},
+        {key: 1, CONTENT_HASH_FIELD: 1, "_id": 0},
+    )
+
+
+def plan_upserts(documents, existing_hashes, key, seen_keys, stats):
+    """ReplaceOne operations for the documents that are new or changed"""
+    operations = []
+    for doc in documents:
+        doc_key = doc[key]
+        seen_keys.add(doc_key)
+        if existing_hashes.get(doc_key) == doc[CONTENT_HASH_FIELD]:
+            stats["unchanged"] += 1
+            continue
+        operations.append(ReplaceOne({key: doc_key}, doc, upsert=True))
+    stats["upserted"] += len(operations)
+    return operations
+
+
+def _new_stats():
+    return {"upserted": 0, "unchanged": 0, "deleted": 0}
+
+
+def sync_csv(collection, file_path, collection_name,
+             chunk_size=CHUNK_SIZE, batch_size=BATCH_SIZE):
+    """Incrementally sync a CSV file into a pymongo collection"""
+    key = NATURAL_KEYS[collection_name]
+    seen_keys = set()
+    stats = _new_stats()
+
+    # The per-chunk $in lookups and upserts rely on the natural-key index
+    collection.create_indexes(index_models(collection_name))
+
+    for documents in _iter_documents(file_path, collection_name, chunk_size):
+        query, projection = _existing_query(documents, key)
+        existing = {doc[key]: doc.get(CONTENT_HASH_FIELD) for doc in collection.find(query, projection)}
+        operations = plan_upserts(documents, existing, key, seen_keys, stats)
+        for batch in _batches(operations, batch_size):
+            collection.bulk_write(batch, ordered=False)
+
+    stale = [
+        DeleteOne({key: doc[key]})
+        for doc in collection.find({}, {key: 1, "_id": 0})
+        if doc.get(key) not in seen_keys
+    ]
+    for batch in _batches(stale, batch_size):
+        collection.bulk_write(batch, ordered=False)
+    stats["deleted"] = len(stale)
+    mark_reloaded(collection.database, collection_name)
+
+    logger.info(f"✅ Synced {collection_name}: {stats['upserted']} upserted, {stats['unchanged']} unchanged, {stats['deleted']} deleted")
+    return stats
+
+
+async def sync_csv_async(collection, file_path, collection_name,
+                         chunk_size=CHUNK_SIZE, batch_size=BATCH_SIZE):
+    """Incrementally sync a CSV file into a Motor collection"""
+    key = NATURAL_KEYS[collection_name]
+    seen_keys = set()
+    stats = _new_stats()
+
+    # The per-chunk $in lookups and upserts rely on the natural-key index
+    await collection.create_indexes(index_models(collection_name))
+
+    for documents in _iter_documents(file_path, collection_name, chunk_size):
+        query, projection = _existing_query(documents, key)
+        existing = {doc[key]: doc.get(CONTENT_HASH_FIELD) async for doc in collection.find(query, projection)}
+        operations = plan_upserts(documents, existing, key, seen_keys, stats)
+        for batch in _batches(operations, batch_size):
+            await collection.bulk_write(batch, ordered=False)
+
+    stale = [
+        DeleteOne({key: doc[key]})
+        async for doc in collection.find({}, {key: 1, "_id": 0})
+        if doc.get(key) not in seen_keys
+    ]
+    for batch in _batches(stale, batch_size):
+        await collection.bulk_write(batch, ordered=False)
+    stats["deleted"] = len(stale)
+    await mark_reloaded_async(collection.database, collection_name)
+
+    logger.info(f"✅ Synced {collection_name}: {stats['upserted']} upserted, {stats['unchanged']} unchanged, {stats['deleted']} deleted")
+    return stats
@@ -0,0 +1,90 @@
+"""
+Declarative index registry for every hot query path.
+
+Indexes are declared once here and applied by the FastAPI ``lifespan``
+startup hook, by the staging swap before a reloaded collection goes
+live, and by incremental loads.  ``index_report`` compares the registry
+with what the server actually has and how often each index is used.
+"""
+import logging
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from document_builder import NATURAL_KEYS
+
+logger = logging.getLogger(__name__)
+
+
+def _natural_key_index(collection_name):
+    key = NATURAL_KEYS[collection_name]
+    return IndexModel([(key, ASCENDING)], unique=True, name=f"{key}_unique")
+
+
+INDEXES = {
+    "distribution_centers": [
+        _natural_key_index("distribution_centers"),
+    ],
+    "products": [
+        _natural_key_index("products"),
+    ],
+    "users": [
+        _natural_key_index("users"),
+    ],
+    "orders": [
+        _natural_key_index("orders"),
+        # /users/{user_id}/orders keyset pages and the chatbot's recent-orders list
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_id_created_at_id"),
+    ],
+    "inventory_items": [
+        _natural_key_index("inventory_items"),
+    ],
+    "order_items": [
+        _natural_key_index("order_items"),
+    ],
+    "chat_messages": [
+        # /chat/history/{session_id} keyset pages, newest first
+        IndexModel([("session_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], name="session_id_timestamp_id"),
+    ],
+}
+
+
+def index_models(collection_name):
+    """Registered indexes for a collection"""
+    return INDEXES.get(collection_name, [])
+
+
+async def ensure_indexes(db, collection_names=None):
+    """Create the registered indexes with a Motor database"""
+    for collection_name in collection_names or INDEXES:
+        try:
+            await db[collection_name].create_indexes(index_models(collection_name))
+        except Exception as e:
+            # A unique index fails on duplicate natural IDs; keep serving and report it
+            logger.error(f"Error creating indexes on {collection_name}: {e}")
+
+
+async def index_report(db):
+    """Missing, unused and unregistered indexes per collection"""
+    report = {}
+    for collection_name, models in INDEXES.items():
+        collection = db[collection_name]
+        expected = [model.document["name"] for model in models]
+        existing = await collection.index_information()
+
+        try:
+            usage = {
+                stat["name"]: stat["accesses"]["ops"]
+                async for stat in collection.aggregate([{"$indexStats": {}}])
+            }
+            unused = [name for name, ops in usage.items() if ops == 0 and name != "_id_"]
+        except Exception as e:
+            # $indexStats needs clusterMonitor-style privileges on some deployments
+            logger.warning(f"Index usage unavailable for {collection_name}: {e}")
+            unused = None
+
+        report[collection_name] = {
+            "missing": [name for name in expected if name not in existing],
+            "unused": unused,
+            "unregistered": [name for name in existing if name != "_id_" and name not in expected],
+        }
+    return report
@@ -0,0 +1,163 @@
+"""
+Pipelined and multi-process CSV ingestion for the loaders.
+
+A worker thread reads CSV chunks and converts them into documents while
+several ``insert_many`` calls run concurrently on the event loop.  The
+two sides are joined by a bounded queue, so at most
+``queue_depth + writer_concurrency + 1`` chunks are held in memory: once
+the queue is full the reader blocks until a writer takes a chunk.
+
+For the large collections the conversion itself can be spread over a
+process pool: the file is split into newline-aligned byte ranges, each
+worker parses and converts its own range, and the results are yielded
+back in file order.
+"""
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from document_builder import build_documents
+
+logger = logging.getLogger(__name__)
+
+# Pushed once per writer when the reader runs out of chunks
+_DONE = object()
+
+# ~20k order_items rows per partition; keeps each worker result well under
+# MongoDB's insert batch limits
+PARTITION_BYTES = 2 * 1024 * 1024
+
+
+def _partition_offsets(file_path, partition_bytes):
+    """Split the rows of a CSV file into newline-aligned (start, end) byte ranges"""
+    offsets = []
+    with open(file_path, "rb") as f:
+        f.readline()  # header
+        start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        while start < size:
+            f.seek(min(start + partition_bytes, size))
+            f.readline()  # move to the end of the current row
+            end = f.tell()
+            offsets.append((start, end))
+            start = end
+    return offsets
+
+
+def _convert_partition(file_path, columns, start, end, collection_name):
+    """Parse and convert one byte range of a CSV file (runs in a worker process)"""
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    df = pd.read_csv(io.BytesIO(data), header=None, names=columns)
+    return build_documents(df, collection_name)
+
+
+def iter_converted_partitions(file_path, collection_name, processes=None,
+                              partition_bytes=PARTITION_BYTES):
+    """Convert a CSV file in a process pool, yielding document batches in file order.
+
+    Partitions are disjoint, so every row (and its natural ID) is produced
+    exactly once.  At most ``2 * processes`` partitions are in flight, which
+    bounds memory regardless of file size.  Rows must not contain quoted
+    newlines, as partition boundaries are found by scanning for line ends.
+    """
+    processes = processes or os.cpu_count()
+    columns = list(pd.read_csv(file_path, nrows=0).columns)
+    window = processes * 2
+
+    # spawn rather than fork: the async loader calls this from a worker thread
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        pending = deque()
+        for start, end in _partition_offsets(file_path, partition_bytes):
+            pending.append(executor.submit(
+                _convert_partition, file_path, columns, start, end, collection_name
+            ))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+async def pipelined_load(collection, file_path, collection_name,
+                         chunk_size=2000, queue_depth=4, writer_concurrency=4, processes=0):
+    """Stream a CSV file into a Motor collection, overlapping parsing with inserts.
+
+    With ``processes`` set, chunks are converted by iter_converted_partitions
+    instead of a single reader thread.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=queue_depth)
+    stop = threading.Event()
+    errors = []
+    total_inserted = 0
+
+    def put(item):
+        # Blocks the reader thread while the queue is full (backpressure)
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def read_chunks():
+        if processes:
+            chunks = iter_converted_partitions(file_path, collection_name, processes)
+        else:
+            chunks = (
+                build_documents(chunk_df, collection_name)
+                for chunk_df in pd.read_csv(file_path, chunksize=chunk_size)
+            )
+        try:
+            for chunk_num, documents in enumerate(chunks, 1):
+                if stop.is_set():
+                    break
+                put((chunk_num, documents))
+        finally:
+            chunks.close()
+            for _ in range(writer_concurrency):
+                put(_DONE)
+
+    async def write_chunks():
+        nonlocal total_inserted
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            if errors:
+                # Keep draining after a failure so the reader never blocks
+                continue
+
+            chunk_num, documents = item
+            if not documents:
+                continue
+            try:
+                result = await collection.insert_many(documents)
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+                continue
+
+            total_inserted += len(result.inserted_ids)
+            logger.info(f"Inserted chunk {chunk_num}: {len(result.inserted_ids)} {collection_name.replace('_', ' ')} (Total: {total_inserted})")
+
+    reader = loop.run_in_executor(None, read_chunks)
+    try:
+        await asyncio.gather(*(write_chunks() for _ in range(writer_concurrency)))
+    finally:
+        stop.set()
+        # If the writers stopped early (e.g. cancellation) the reader may be
+        # blocked on a full queue; drain it so the thread can exit.
+        while not reader.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.sleep(0.01)
+    await reader
+
+    if errors:
+        raise errors[0]
+    return total_inserted
@@ -0,0 +1,150 @@
+"""
+Single-pass intent and ID entity matching for chat messages.
+
+Every intent keyword and ID pattern is folded into one regex whose
+alternation is factored as a trie on the literal prefixes, so the
+engine tries at most one branch per character instead of every keyword
+in turn.  Keywords keep the old substring semantics ("hi" still matches
+inside "this"), and overlapping matches are found by restarting the
+search one character after each hit.
+"""
+import re
+
+# ID patterns in priority order: (entity, literal prefix, regex tail)
+ID_PATTERNS = [
+    ("inventory", "inventory_id", r"[:\s]+([0-9]+)"),
+    ("inventory", "inventory", r"[\s_]item[\s_]id[:\s]+([0-9]+)"),
+    ("product", "product_id", r"[:\s]+([0-9]+)"),
+    ("order", "order_id", r"[:\s]+([0-9]+)"),
+    ("user", "user_id", r"[:\s]+([0-9]+)"),
+]
+
+# Intents in priority order, each matched by any of its keywords
+INTENT_KEYWORDS = [
+    ("order", ["order", "purchase", "buy", "bought"]),
+    ("inventory", ["inventory", "inventory_item", "stock"]),
+    ("product", ["product", "item", "search", "find"]),
+    ("status", ["status", "track", "tracking", "shipped", "delivered"]),
+    ("return", ["return", "refund", "exchange"]),
+    ("greeting", ["hello", "hi", "hey", "help"]),
+]
+
+# Follow-ups refer back to something already discussed and may be
+# answered from session context.  They are whole-word phrases matched
+# apart from the keyword trie (as trie keywords they slowed every message
+# down) and never replace the keyword intent: "that order" can accompany
+# any intent, the vaguer phrases only count when no keyword matched.
+FOLLOWUP_REFERENCE = r"\b(?:that|this|the same) (order|product|item|user|inventory item)\b"
+FOLLOWUP_PHRASES = r"\b(?:details?|more info|tell me more|about (?:it|that)|that one)\b"
+# Entity remembered in the session for each noun a follow-up can name
+REFERENCE_ENTITIES = {
+    "order": "order",
+    "product": "product",
+    "item": "product",
+    "user": "user",
+    "inventory item": "inventory",
+}
+# Intents asking for something other than the remembered entity's details
+# ("can I return this item?"), so their messages are never follow-ups
+ACTION_INTENTS = ("inventory", "status", "return")
+
+
+def _trie_pattern(entries):
+    """Alternation of (literal, tail) entries factored on common prefixes.
+
+    At each node, regex tails are tried first, then longer literals, then
+    the literal ending there, so an ID pattern wins over a keyword that
+    starts at the same position and "tracking" wins over "track".
+    """
+    root = {}
+    for literal, tail in entries:
+        node = root
+        for char in literal:
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(tail)
+
+    def emit(node):
+        ends = node.get(None, [])
+        alternatives = [tail for tail in ends if tail]
+        alternatives += [re.escape(char) + emit(child) for char, child in node.items() if char is not None]
+        if "" in ends:
+            alternatives.append("")
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return "(?:" + "|".join(alternatives) + ")"
+
+    return emit(root)
+
+
+class IntentMatcher:
+    def __init__(self, id_patterns=ID_PATTERNS, intent_keywords=INTENT_KEYWORDS, action_intents=ACTION_INTENTS):
+        entries = []
+        self.id_groups = {}
+        for priority, (entity, literal, tail) in enumerate(id_patterns):
+            group = f"id{priority}"
+            entries.append((literal, tail.replace("(", f"(?P<{group}>", 1)))
+            self.id_groups[group] = (priority, entity)
+
+        self.keyword_intents = {}
+        for priority, (intent, keywords) in enumerate(intent_keywords):
+            for keyword in keywords:
+                self.keyword_intents.setdefault(keyword, (priority, intent))
+                entries.append((keyword, ""))
+
+        self.pattern = re.compile(_trie_pattern(entries))
+        self.action_pattern = re.compile(_trie_pattern([
+            (keyword, "") for intent, keywords in intent_keywords if intent in action_intents for keyword in keywords
+        ]))
+        self.reference_pattern = re.compile(FOLLOWUP_REFERENCE)
+        self.followup_pattern = re.compile(FOLLOWUP_PHRASES)
+
+    def match(self, message):
+        """Classify a message and extract its IDs in one scan.
+
+        Returns ``{"intent": ..., "followup": ..., "refers_to": ...,
+        "entities": [(entity, id), ...]}`` where ``intent`` is the
+        highest-priority intent whose keyword appears (or None),
+        ``followup`` is True when the message refers back to something
+        already discussed and asks for no action intent, ``refers_to`` is
+        the entity a "that order" style follow-up names, and ``entities``
+        are ordered by pattern priority, then position, so ``entities[0]``
+        is the ID the old lookup chain chose.
+        """
+        text = message.lower()
+        search = self.pattern.search
+        intent = None
+        entities = []
+        position = 0
+        while True:
+            found = search(text, position)
+            if found is None:
+                break
+            group = found.lastgroup
+            if group is not None:
+                priority, entity = self.id_groups[group]
+                entities.append((priority, found.start(), entity, int(found.group(group))))
+            else:
+                candidate = self.keyword_intents[found.group()]
+                if intent is None or candidate < intent:
+                    intent = candidate
+            position = found.start() + 1
+
+        entities.sort()
+        intent = intent[1] if intent else None
+        # IDs are answered before follow-ups, and substring checks let most
+        # other messages skip the follow-up regexes
+        reference = None
+        followup = False
+        if not entities:
+            if "that " in text or "this " in text or "same " in text:
+                reference = self.reference_pattern.search(text)
+            if reference is not None:
+                followup = self.action_pattern.search(text) is None
+            elif intent is None and ("more" in text or "detail" in text or "about" in text or "that one" in text):
+                followup = self.followup_pattern.search(text) is not None
+        return {
+            "intent": intent,
+            "followup": followup,
+            "refers_to": REFERENCE_ENTITIES[reference.group(1)] if followup and reference is not None else None,
+            "entities": [(entity, value) for _, _, entity, value in entities],
+        }
@@ -0,0 +1,131 @@
+"""
+In-process cache for the chatbot's by-ID lookups.
+
+Support agents ask about the same handful of products, orders and users
+over and over, so the documents fetched by ``find_one`` are kept in a
+size-bounded LRU with a TTL per entity type (orders and inventory change
+status, products and users rarely do).  Concurrent misses for the same
+key share one database round trip.  Entries are dropped when the
+collection they came from is reloaded.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_ENTRIES = 10_000
+
+# Seconds a cached document stays fresh, per entity type
+ENTITY_TTLS = {
+    "product": 600,
+    "user": 300,
+    "inventory": 60,
+    "order": 30,
+}
+
+# Collection each entity type is read from, for reload invalidation
+ENTITY_COLLECTIONS = {
+    "product": "products",
+    "user": "users",
+    "inventory": "inventory_items",
+    "order": "orders",
+}
+
+
+class LookupCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttls=ENTITY_TTLS):
+        self.max_entries = max_entries
+        self.ttls = ttls
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    async def get_or_load(self, entity, key, loader):
+        """Cached document for (entity, key), calling ``await loader()`` on a miss.
+
+        ``None`` results (unknown IDs) are cached too.
+        """
+        cache_key = (entity, key)
+        entry = self.entries.get(cache_key)
+        if entry is not None:
+            expires_at, document = entry
+            if expires_at > time.monotonic():
+                self.entries.move_to_end(cache_key)
+                self.hits += 1
+                return document
+            del self.entries[cache_key]
+
+        # Another request is already fetching this key: wait for its result
+        if cache_key in self.pending:
+            self.coalesced += 1
+            shared = self.pending[cache_key]
+            try:
+                return await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                if not shared.cancelled():
+                    raise
+                # The loading request was cancelled (client went away), not this one: load it here
+                return await self.get_or_load(entity, key, loader)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self.pending[cache_key] = future
+        try:
+            document = await loader()
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark it retrieved for the no-waiter case
+            future.exception()
+            raise
+        else:
+            future.set_result(document)
+            self._store(cache_key, document)
+            return document
+        finally:
+            # Cancelled (CancelledError is not an Exception): release the waiters
+            if not future.done():
+                future.cancel()
+            del self.pending[cache_key]
+
+    def _store(self, cache_key, document):
+        self.entries[cache_key] = (time.monotonic() + self.ttls.get(cache_key[0], 60), document)
+        self.entries.move_to_end(cache_key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, collection_names=None):
+        """Drop entries read from the given collections (all entries for None)"""
+        if collection_names is None:
+            dropped = len(self.entries)
+            self.entries.clear()
+        else:
+            names = set(collection_names)
+            stale = [key for key in self.entries if ENTITY_COLLECTIONS.get(key[0]) in names]
+            for key in stale:
+                del self.entries[key]
+            dropped = len(stale)
+        if dropped:
+            logger.info(f"Lookup cache invalidated {dropped} entries")
+        return dropped
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Shared instance used by ChatbotService
+lookup_cache = LookupCache()
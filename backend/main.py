@@ -1,13 +1,29 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from contextlib import asynccontextmanager
 import uvicorn
+import json
+from pydantic import ValidationError
 import logging
 from datetime import datetime
+from typing import List, Optional
 
-from database import connect_to_mongo, close_mongo_connection, get_database
+from repositories import close_storage, connect_storage, get_repositories
 from models import ChatRequest, ChatResponse, ChatMessage
 from chatbot_service import ChatbotService
+from indexes import index_report
+from product_search import MAX_LIMIT as SEARCH_MAX_LIMIT, product_index
+import product_search
+from autocomplete import MAX_LIMIT as AUTOCOMPLETE_MAX_LIMIT, autocomplete_index
+from data_events import reload_watcher
+from lookup_cache import ENTITY_COLLECTIONS, lookup_cache
+from session_context import session_contexts
+from data_stats import STATS_COLLECTIONS, data_stats
+from projections import projection
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, registry as metrics_registry
+from profiling import ProfilingMiddleware, is_admin, profile_store
+from query_monitor import query_monitor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,15 +32,59 @@ logger = logging.getLogger(__name__)
 # Initialize chatbot service
 chatbot_service = ChatbotService()
 
+async def refresh_product_indexes(changed=None):
+    """Rebuild the in-memory product search and autocomplete indexes"""
+    try:
+        products = await get_repositories().products.all(projection("product_catalog"))
+        product_index.build_from(products)
+        autocomplete_index.build_from(products)
+        logger.info(f"Product indexes built from {len(products)} products")
+    except Exception as e:
+        logger.error(f"Error building product indexes: {e}")
+
+reload_watcher.subscribe(["products"], refresh_product_indexes)
+reload_watcher.subscribe(ENTITY_COLLECTIONS.values(), lookup_cache.invalidate)
+reload_watcher.subscribe(STATS_COLLECTIONS, data_stats.invalidate)
+
+def collect_cache_metrics():
+    """Counters the caches and the history writer already keep, read at scrape time"""
+    cache = lookup_cache.stats()
+    metrics = [
+        (f"lookup_cache_{name}_total", "counter", f"Lookup cache {name}", [({}, cache[name])])
+        for name in ("hits", "misses", "coalesced", "evictions")
+    ]
+    metrics += [
+        ("lookup_cache_hit_ratio", "gauge", "Share of lookups answered from the cache", [({}, cache["hit_rate"])]),
+        ("lookup_cache_entries", "gauge", "Entities held by the lookup cache", [({}, cache["entries"])]),
+        ("session_contexts", "gauge", "Chat sessions with remembered context", [({}, session_contexts.stats()["sessions"])]),
+    ]
+    if chatbot_service.history:
+        history = chatbot_service.history.stats()
+        metrics += [
+            ("chat_history_buffered", "gauge", "Chat messages waiting to be written", [({}, history["buffered"])]),
+            ("chat_history_written_total", "counter", "Chat messages written", [({}, history["written"])]),
+            ("chat_history_failed_total", "counter", "Chat messages dropped after failed writes", [({}, history["failed"])]),
+        ]
+    return metrics
+
+metrics_registry.register_collector(collect_cache_metrics)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    await connect_to_mongo()
+    repositories = await connect_storage()
+    await repositories.store.ensure_indexes()
+    await refresh_product_indexes()
+    # Reloads are announced through MongoDB; other backends are loaded once at startup
+    if repositories.store.database is not None:
+        await reload_watcher.start(repositories.store.database)
     await chatbot_service.initialize()
     logger.info("Application startup complete")
     yield
     # Shutdown
-    await close_mongo_connection()
+    await reload_watcher.stop()
+    await chatbot_service.shutdown()
+    await close_storage()
     logger.info("Application shutdown complete")
 
 app = FastAPI(
@@ -43,6 +103,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request cProfile capture on X-Profile + X-Admin-Token, or PROFILE_SAMPLE_RATE
+app.add_middleware(ProfilingMiddleware)
+
+# Request latency and in-flight counts, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -72,50 +138,217 @@ async def chat_endpoint(request: ChatRequest):
         logger.error(f"Error in chat endpoint: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """Stream the chatbot response as Server-Sent Events"""
+    async def events():
+        async for chunk in chatbot_service.stream_message(
+            message=request.message,
+            session_id=request.session_id,
+            user_id=request.user_id
+        ):
+            yield f"data: {json.dumps({'delta': chunk})}\n\n"
+        
+        done = {"session_id": request.session_id, "timestamp": datetime.utcnow().isoformat()}
+        yield f"event: done\ndata: {json.dumps(done)}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Open chat WebSocket per session; a reconnect replaces the old one
+chat_connections = {}
+
+@app.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket, session_id: str, user_id: Optional[int] = None):
+    """Chat over one WebSocket per session"""
+    await websocket.accept()
+    previous = chat_connections.get(session_id)
+    chat_connections[session_id] = websocket
+    if previous is not None:
+        try:
+            await previous.close(code=4000, reason="Session opened on another connection")
+        except Exception:
+            pass
+    
+    # Connection-local session state
+    state = {
+        "session_id": session_id,
+        "user_id": user_id,
+        "connected_at": datetime.utcnow(),
+        "messages": 0
+    }
+    
+    try:
+        while True:
+            try:
+                payload = json.loads(await websocket.receive_text())
+            except ValueError:
+                await websocket.send_json({"error": "Expected a JSON object with a 'message' field"})
+                continue
+            if not isinstance(payload, dict) or not payload.get("message"):
+                await websocket.send_json({"error": "Expected a JSON object with a 'message' field"})
+                continue
+            try:
+                request = ChatRequest(**{**payload, "session_id": session_id})
+            except ValidationError as e:
+                fields = ", ".join(str(error["loc"][0]) for error in e.errors() if error["loc"])
+                await websocket.send_json({"error": f"Invalid {fields or 'message'}: {e.errors()[0]['msg']}"})
+                continue
+            if "user_id" in payload:
+                state["user_id"] = request.user_id
+            
+            if payload.get("stream"):
+                async for chunk in chatbot_service.stream_message(
+                    message=request.message,
+                    session_id=session_id,
+                    user_id=state["user_id"]
+                ):
+                    await websocket.send_json({"delta": chunk})
+                await websocket.send_json({"done": True, "session_id": session_id, "timestamp": datetime.utcnow().isoformat()})
+            else:
+                response = await chatbot_service.process_message(
+                    message=request.message,
+                    session_id=session_id,
+                    user_id=state["user_id"]
+                )
+                await websocket.send_json({"response": response, "session_id": session_id, "timestamp": datetime.utcnow().isoformat()})
+            state["messages"] += 1
+    
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Error in chat websocket: {e}")
+    finally:
+        if chat_connections.get(session_id) is websocket:
+            del chat_connections[session_id]
+        logger.info(f"Chat websocket closed for {session_id} after {state['messages']} message(s)")
+
+# Largest number of messages accepted by /chat/batch
+MAX_BATCH_SIZE = 500
+
+@app.post("/chat/batch", response_model=List[ChatResponse])
+async def chat_batch_endpoint(requests: List[ChatRequest]):
+    """Process a list of chat messages concurrently, responses in input order"""
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_SIZE} messages")
+    
+    try:
+        responses = await chatbot_service.process_batch(requests)
+        
+        timestamp = datetime.utcnow()
+        return [
+            ChatResponse(response=response, session_id=request.session_id, timestamp=timestamp)
+            for request, response in zip(requests, responses)
+        ]
+    
+    except Exception as e:
+        logger.error(f"Error in chat batch endpoint: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @app.get("/chat/history/{session_id}")
-async def get_chat_history(session_id: str, limit: int = 10):
-    """Get chat history for a session"""
+async def get_chat_history(session_id: str, limit: int = 10, cursor: Optional[str] = None):
+    """Get chat history for a session, one page at a time"""
     try:
-        history = await chatbot_service.get_chat_history(session_id, limit)
-        return {"session_id": session_id, "history": history}
+        history, next_cursor = await chatbot_service.get_chat_history(session_id, limit, cursor)
+        
+        # Convert ObjectId to string for JSON serialization
+        for message in history:
+            if "_id" in message:
+                message["_id"] = str(message["_id"])
+        
+        return {"session_id": session_id, "history": history, "next_cursor": next_cursor}
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting chat history: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/data/stats")
-async def get_data_stats():
-    """Get statistics about the loaded data"""
+async def get_data_stats(exact: bool = False):
+    """Get statistics about the loaded data (exact=true counts every document)"""
     try:
-        db = get_database()
-        
-        stats = {}
-        collections = [
-            "distribution_centers", "products", "users", 
-            "orders", "inventory_items", "order_items"
-        ]
-        
-        for collection_name in collections:
-            collection = db[collection_name]
-            count = await collection.count_documents({})
-            stats[collection_name] = count
+        stats, computed_at = await data_stats.get(get_repositories(), exact)
         
-        return {"data_statistics": stats, "timestamp": datetime.utcnow()}
+        return {
+            "data_statistics": stats,
+            "exact": exact,
+            "computed_at": computed_at,
+            "timestamp": datetime.utcnow()
+        }
     
     except Exception as e:
         logger.error(f"Error getting data stats: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/data/indexes")
+async def get_index_report():
+    """Report missing, unused and unregistered indexes"""
+    try:
+        database = get_repositories().store.database
+        if database is None:
+            raise HTTPException(status_code=501, detail="Index reports need the MongoDB storage backend")
+        report = await index_report(database)
+        return {"indexes": report, "timestamp": datetime.utcnow()}
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting index report: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/data/cache")
+async def get_cache_stats():
+    """Get hit/miss counters of the chatbot lookup cache and session store"""
+    return {
+        "lookup_cache": lookup_cache.stats(),
+        "session_contexts": session_contexts.stats(),
+        "timestamp": datetime.utcnow()
+    }
+
+@app.get("/data/queries")
+async def get_query_stats(limit: int = 20):
+    """Get MongoDB command latency per filter shape, slowest total first, and the latest slow commands"""
+    return {"queries": query_monitor.report(min(max(limit, 1), 500)), "timestamp": datetime.utcnow()}
+
+@app.get("/data/chat-history")
+async def get_chat_history_stats():
+    """Get the state of the chat history writer"""
+    history = chatbot_service.history.stats() if chatbot_service.history else None
+    return {"chat_history": history, "timestamp": datetime.utcnow()}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Latency histograms and counters in the Prometheus text format"""
+    return Response(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/debug/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """List the kept request profiles, newest first"""
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    return {"profiles": profile_store.list()}
+
+@app.get("/debug/profiles/{profile_id}")
+async def get_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    """Get one request profile: wall, CPU and storage wait time, hottest modules and functions"""
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    profile = profile_store.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
 @app.get("/users/{user_id}/orders")
-async def get_user_orders(user_id: int, limit: int = 10):
-    """Get orders for a specific user"""
+async def get_user_orders(user_id: int, limit: int = 10, cursor: Optional[str] = None):
+    """Get orders for a specific user, newest first, one page at a time"""
     try:
-        db = get_database()
-        orders_collection = db.orders
-        
-        orders = await orders_collection.find(
-            {"user_id": user_id}
-        ).sort("created_at", -1).limit(limit).to_list(length=limit)
+        orders, next_cursor = await get_repositories().orders.page_for_user(
+            user_id, cursor=cursor, limit=limit, projection=projection("user_orders")
+        )
         
         # Convert ObjectId to string for JSON serialization
         for order in orders:
@@ -125,9 +358,12 @@ async def get_user_orders(user_id: int, limit: int = 10):
         return {
             "user_id": user_id,
             "orders": orders,
-            "count": len(orders)
+            "count": len(orders),
+            "next_cursor": next_cursor
         }
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting user orders: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -136,19 +372,9 @@ async def get_user_orders(user_id: int, limit: int = 10):
 async def search_products(q: str, limit: int = 10):
     """Search products by name, brand, or category"""
     try:
-        db = get_database()
-        products_collection = db.products
-        
-        search_query = {
-            "$or": [
-                {"name": {"$regex": q, "$options": "i"}},
-                {"brand": {"$regex": q, "$options": "i"}},
-                {"category": {"$regex": q, "$options": "i"}},
-                {"department": {"$regex": q, "$options": "i"}}
-            ]
-        }
-        
-        products = await products_collection.find(search_query).limit(limit).to_list(length=limit)
+        limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+        # Ranked results from the in-memory index built at startup
+        products = await product_search.search_products(get_repositories(), [q], limit, projection=projection("product_catalog"))
         
         # Convert ObjectId to string for JSON serialization
         for product in products:
@@ -165,6 +391,23 @@ async def search_products(q: str, limit: int = 10):
         logger.error(f"Error searching products: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/products/autocomplete")
+async def autocomplete_products(prefix: str, limit: int = 10):
+    """Suggest product names and brands starting with a prefix"""
+    try:
+        limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+        suggestions = autocomplete_index.complete(prefix, limit)
+        
+        return {
+            "prefix": prefix,
+            "suggestions": suggestions,
+            "count": len(suggestions)
+        }
+    
+    except Exception as e:
+        logger.error(f"Error completing products: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -0,0 +1,68 @@
+"""
+Keyset (cursor) pagination for newest-first listings.
+
+Pages are ordered by ``(<time field> desc, _id desc)`` and the next page
+starts strictly after the last document returned, so page N costs one
+index seek plus ``limit`` documents no matter how deep it is.  Cursors
+are opaque URL-safe tokens encoding that last ``(time, _id)`` pair.
+"""
+import base64
+import json
+from datetime import datetime
+
+from bson import ObjectId
+
+MAX_PAGE_SIZE = 100
+
+
+def page_size(limit):
+    """Clamp a requested limit to 1..MAX_PAGE_SIZE"""
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(sort_value, document_id):
+    payload = json.dumps([sort_value.isoformat(), str(document_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(datetime, ObjectId) from a cursor token; ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, document_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), ObjectId(document_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def keyset_filter(base_filter, sort_field, after):
+    """MongoDB filter: base_filter restricted to documents after the
+    (sort value, _id) pair ``after`` in (sort_field, _id) desc order"""
+    if not after:
+        return base_filter
+    sort_value, document_id = after
+    return {
+        "$and": [
+            base_filter,
+            {"$or": [
+                {sort_field: {"$lt": sort_value}},
+                {sort_field: sort_value, "_id": {"$lt": document_id}},
+            ]},
+        ]
+    }
+
+
+async def fetch_page(store, collection_name, equals, sort_field, cursor=None, limit=10, projection=None):
+    """(documents newest first, next_cursor or None) for one page"""
+    limit = page_size(limit)
+    after = decode_cursor(cursor) if cursor else None
+    documents = await store.find(
+        collection_name, equals, projection, sort_field=sort_field, limit=limit + 1, after=after
+    )
+
+    # The extra document only tells whether another page exists
+    if len(documents) <= limit:
+        return documents, None
+    documents = documents[:limit]
+    last = documents[-1]
+    return documents, encode_cursor(last[sort_field], last["_id"])
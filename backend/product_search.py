@@ -0,0 +1,131 @@
+"""
+In-process product search engine.
+
+The ``products`` collection is small enough to index in memory, so at
+startup every product's name, brand, category and department are
+tokenized into an inverted index.  Queries are answered with ranked
+results (field-weighted TF-IDF, exact tokens above prefix matches,
+products matching more of the query terms first) without touching
+MongoDB.  Until the index is built, searches fall back to the old
+``$regex`` query.
+"""
+import logging
+import math
+import re
+from bisect import bisect_left
+
+import numpy as np
+
+from repositories import project
+
+logger = logging.getLogger(__name__)
+
+MAX_LIMIT = 50
+
+# Searchable fields and how much a hit in each contributes to the score
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "brand": 2.0,
+    "category": 1.5,
+    "department": 1.0,
+}
+
+# A query term that is only a prefix of an indexed token ("shoe" -> "shoes")
+PREFIX_MATCH_FACTOR = 0.5
+MAX_PREFIX_EXPANSIONS = 50
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens of a string"""
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+class ProductSearchIndex:
+    def __init__(self):
+        self.products = []
+        self.postings = {}
+        self.vocabulary = []
+        self.ready = False
+
+    def build_from(self, products):
+        """Build the index from product documents"""
+        weights = {}
+        for position, product in enumerate(products):
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in set(tokenize(product.get(field, ""))):
+                    entries = weights.setdefault(token, {})
+                    entries[position] = entries.get(position, 0.0) + weight
+
+        # Posting lists as (positions, idf-scaled weights) arrays so a query
+        # scores every matching product with a few vectorized operations
+        total = len(products)
+        postings = {}
+        for token, entries in weights.items():
+            idf = math.log(1 + total / len(entries))
+            positions = np.fromiter(entries.keys(), dtype=np.int64, count=len(entries))
+            scores = np.fromiter(entries.values(), dtype=np.float64, count=len(entries)) * idf
+            postings[token] = (positions, scores)
+
+        # Swap everything in at once so concurrent searches see a consistent index
+        self.products, self.postings = products, postings
+        self.vocabulary = sorted(postings)
+        self.ready = True
+
+    def _expand(self, term):
+        """Indexed tokens matching a query term, with their match factor"""
+        matches = []
+        if term in self.postings:
+            matches.append((term, 1.0))
+        start = bisect_left(self.vocabulary, term)
+        for token in self.vocabulary[start:start + MAX_PREFIX_EXPANSIONS + 1]:
+            if not token.startswith(term):
+                break
+            if token != term:
+                matches.append((token, PREFIX_MATCH_FACTOR))
+        return matches
+
+    def search(self, terms, limit=10):
+        """Ranked products matching any of the terms, best first"""
+        terms = list(dict.fromkeys(term for text in terms for term in tokenize(text)))
+        if not terms or not self.products:
+            return []
+
+        total = len(self.products)
+        scores = np.zeros(total)
+        matched_terms = np.zeros(total, dtype=np.int64)
+        for term in terms:
+            term_scores = np.zeros(total)
+            for token, factor in self._expand(term):
+                positions, token_scores = self.postings[token]
+                np.maximum.at(term_scores, positions, token_scores * factor)
+            scores += term_scores
+            matched_terms += term_scores > 0
+
+        candidates = np.flatnonzero(matched_terms)
+        if len(candidates) > limit:
+            # Products matching more of the query terms rank first
+            rank = matched_terms[candidates] * (scores.max() + 1) + scores[candidates]
+            candidates = candidates[np.argpartition(-rank, limit)[:limit]]
+        order = np.lexsort((candidates, -scores[candidates], -matched_terms[candidates]))
+        return [dict(self.products[position]) for position in candidates[order][:limit]]
+
+
+# Shared instance, built in the FastAPI lifespan hook
+product_index = ProductSearchIndex()
+
+
+async def search_products(repositories, terms, limit=10, projection=None):
+    """Search with the in-memory index, or the storage backend's substring
+    search (the $regex query on MongoDB) until it is built"""
+    if product_index.ready:
+        products = product_index.search(terms, limit)
+        if projection:
+            products = [project(product, projection) for product in products]
+        return products
+
+    terms = [term for text in terms for term in tokenize(text)]
+    if not terms:
+        return []
+    return await repositories.products.search(terms, limit, projection)
@@ -0,0 +1,221 @@
+"""
+On-demand cProfile capture of single requests.
+
+A request is profiled when it carries ``X-Profile: 1`` together with the
+admin token (``X-Admin-Token``, matching ``ADMIN_TOKEN``), or when it is
+picked by ``PROFILE_SAMPLE_RATE``.  Without ``ADMIN_TOKEN`` only sampling
+can turn profiling on.  The response gets an ``X-Profile-Id`` header and
+the profile is kept in memory for ``GET /debug/profiles/{id}`` (and
+written as a ``.prof`` file for snakeviz/pstats when ``PROFILE_DIRECTORY``
+is set).
+
+Each profile splits the request's wall time into:
+
+* ``cpu_ms``             - CPU time of the event loop thread
+* ``storage_wait_ms``    - time awaiting the storage backend (Motor for
+  MongoDB), summed over every store call the request made
+* ``chatbot_service_ms`` - CPU time in ``ChatbotService``'s own code
+
+and lists where the CPU went per module and per function, which is where
+regex matching (``re.Pattern`` methods), BSON decoding (``bson``) and
+response formatting (``_format_*``) show up.
+
+Python has one profiler slot per thread and the event loop interleaves
+requests, so only one request is profiled at a time and the CPU figures
+include any other request that ran while this one was waiting.  Profile
+on a quiet instance for clean numbers; ``storage_wait_ms`` is always
+this request's own.  With the in-process memory store the storage wait
+is CPU time too, so it is also counted in ``cpu_ms``.
+
+For the same reason every request interleaved with a profiled one runs
+under the profiler as well: at 16 concurrent requests a 1% sample rate
+cost about 20% of throughput in ``bench/load_test.py``.
+"""
+import cProfile
+import hmac
+import logging
+import os
+import pstats
+import random
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIRECTORY = os.getenv("PROFILE_DIRECTORY")
+# Profiles kept for /debug/profiles, oldest dropped first
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+# Functions listed per profile
+PROFILE_TOP_FUNCTIONS = 30
+
+# Never sampled: scrapes and profile downloads
+UNSAMPLED_PREFIXES = ("/metrics", "/debug/profiles")
+
+# Storage waits of the request being profiled
+_current = ContextVar("request_profile", default=None)
+
+
+def is_admin(token):
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def record_storage_wait(seconds):
+    """Add a store call to the profile of the current request, if it is being profiled"""
+    waits = _current.get()
+    if waits is not None:
+        waits["seconds"] += seconds
+        waits["calls"] += 1
+
+
+def _module_of(filename):
+    if filename == "~":
+        return "built-in"
+    if filename.startswith("<"):
+        return filename.strip("<>")
+    name = os.path.splitext(os.path.basename(filename))[0]
+    if name == "__init__":
+        name = os.path.basename(os.path.dirname(filename))
+    return name
+
+
+def _function_label(filename, line, function):
+    if filename == "~":
+        return function
+    return f"{_module_of(filename)}:{line}({function})"
+
+
+def summarize(profiler, wall, cpu, storage_waits):
+    """Breakdown of one profiled request"""
+    stats = pstats.Stats(profiler).stats
+    modules = {}
+    functions = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in stats.items():
+        module = _module_of(filename)
+        modules[module] = modules.get(module, 0.0) + own
+        functions.append({
+            "function": _function_label(filename, line, function),
+            "calls": calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        })
+    functions.sort(key=lambda entry: entry["own_ms"], reverse=True)
+    return {
+        "wall_ms": round(wall * 1000, 3),
+        "cpu_ms": round(cpu * 1000, 3),
+        "storage_wait_ms": round(storage_waits["seconds"] * 1000, 3),
+        "storage_calls": storage_waits["calls"],
+        "chatbot_service_ms": round(modules.get("chatbot_service", 0.0) * 1000, 3),
+        "modules_ms": {
+            module: round(seconds * 1000, 3)
+            for module, seconds in sorted(modules.items(), key=lambda item: item[1], reverse=True)
+        },
+        "functions": functions[:PROFILE_TOP_FUNCTIONS],
+    }
+
+
+class ProfileStore:
+    """Most recent profiles by id"""
+
+    def __init__(self, max_entries=PROFILE_KEEP, directory=PROFILE_DIRECTORY):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.profiles = OrderedDict()
+
+    def add(self, profile, profiler):
+        self.profiles[profile["id"]] = profile
+        while len(self.profiles) > self.max_entries:
+            self.profiles.popitem(last=False)
+        if self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                profiler.dump_stats(os.path.join(self.directory, f"{profile['id']}.prof"))
+            except OSError as e:
+                logger.error(f"Error writing profile {profile['id']}: {e}")
+
+    def get(self, profile_id):
+        return self.profiles.get(profile_id)
+
+    def list(self):
+        """Newest first, without the per-function detail"""
+        return [
+            {key: value for key, value in profile.items() if key not in ("modules_ms", "functions")}
+            for profile in reversed(self.profiles.values())
+        ]
+
+
+profile_store = ProfileStore()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests asked for by an admin, or sampled"""
+
+    def __init__(self, app, sample_rate=PROFILE_SAMPLE_RATE, store=profile_store):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.store = store
+        self.active = False
+
+    def _trigger(self, scope):
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") == b"1":
+            token = headers.get(b"x-admin-token")
+            if is_admin(token.decode("latin-1") if token else None):
+                return "header"
+        if self.sample_rate and not scope["path"].startswith(UNSAMPLED_PREFIXES) and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = self._trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+        if self.active:
+            logger.warning(f"⚠️ Not profiling {scope['path']}: another request is being profiled")
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        status = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        storage_waits = {"seconds": 0.0, "calls": 0}
+        token = _current.set(storage_waits)
+        profiler = cProfile.Profile()
+        self.active = True
+        started_at = datetime.utcnow()
+        start, start_cpu = time.perf_counter(), time.thread_time()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.disable()
+            wall, cpu = time.perf_counter() - start, time.thread_time() - start_cpu
+            self.active = False
+            _current.reset(token)
+            profile = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "trigger": trigger,
+                "started_at": started_at.isoformat(),
+                **summarize(profiler, wall, cpu, storage_waits),
+            }
+            self.store.add(profile, profiler)
+            logger.info(f"🔬 Profiled {profile['method']} {profile['path']} as {profile_id}: {profile['wall_ms']:.1f}ms wall, "
+                        f"{profile['cpu_ms']:.1f}ms CPU, {profile['storage_wait_ms']:.1f}ms storage wait")
@@ -0,0 +1,67 @@
+"""
+Field projections for every query the API and chatbot run.
+
+Each formatter's fields are listed once here, and each query's
+projection is built from the formatters its documents reach, so
+MongoDB only sends (and the driver only decodes) what gets rendered.
+``check_projections.py`` fails if a formatter reads a field its
+projection leaves out.
+"""
+
+# Fields each ChatbotService formatter reads
+INVENTORY_DETAIL_FIELDS = (
+    "inventory_id", "product_id", "product_name", "product_brand", "product_category",
+    "product_department", "product_sku", "cost", "product_retail_price",
+    "product_distribution_center_id", "sold_at", "created_at",
+)
+PRODUCT_DETAIL_FIELDS = (
+    "product_id", "name", "brand", "category", "department", "cost",
+    "retail_price", "sku", "distribution_center_id",
+)
+ORDER_DETAIL_FIELDS = (
+    "order_id", "status", "user_id", "num_of_item", "created_at",
+    "shipped_at", "delivered_at", "returned_at",
+)
+USER_DETAIL_FIELDS = (
+    "user_id", "first_name", "last_name", "email", "age", "gender",
+    "city", "state", "country", "traffic_source", "created_at",
+)
+ORDER_LINE_FIELDS = ("order_id", "status", "created_at", "num_of_item")
+PRODUCT_LINE_FIELDS = ("name", "brand", "retail_price", "category")
+INVENTORY_SAMPLE_FIELDS = ("inventory_id", "product_name", "product_retail_price")
+
+# Fields of the public API models (everything except loader bookkeeping)
+PRODUCT_FIELDS = (
+    "product_id", "cost", "category", "name", "brand", "retail_price",
+    "department", "sku", "distribution_center_id",
+)
+ORDER_FIELDS = (
+    "order_id", "user_id", "status", "gender", "created_at",
+    "returned_at", "shipped_at", "delivered_at", "num_of_item",
+)
+CHAT_MESSAGE_FIELDS = ("session_id", "user_message", "bot_response", "timestamp", "user_id")
+
+
+def _fields(*groups):
+    return tuple(dict.fromkeys(field for group in groups for field in group))
+
+
+# Fields fetched by each query.  List queries also include the detail
+# fields because their first document is remembered for follow-ups.
+QUERY_FIELDS = {
+    "inventory_by_id": INVENTORY_DETAIL_FIELDS,
+    "product_by_id": PRODUCT_DETAIL_FIELDS,
+    "order_by_id": ORDER_DETAIL_FIELDS,
+    "user_by_id": USER_DETAIL_FIELDS,
+    "recent_orders": _fields(ORDER_LINE_FIELDS, ORDER_DETAIL_FIELDS),
+    "chatbot_product_search": _fields(PRODUCT_LINE_FIELDS, PRODUCT_DETAIL_FIELDS),
+    "inventory_sample": INVENTORY_SAMPLE_FIELDS,
+    "chat_history": CHAT_MESSAGE_FIELDS,
+    "user_orders": ORDER_FIELDS,
+    "product_catalog": PRODUCT_FIELDS,
+}
+
+
+def projection(query):
+    """MongoDB projection for a registered query (``_id`` is always returned)"""
+    return {field: 1 for field in QUERY_FIELDS[query]}
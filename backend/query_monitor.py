@@ -0,0 +1,266 @@
+"""
+Slow-query log and per-filter-shape statistics from pymongo command
+monitoring.
+
+``query_monitor`` is registered as a command listener on the API's Motor
+client, on ``get_sync_database`` and on the clients the loaders
+(``DirectDataLoader``, ``AsyncDataLoader``, ``OrderItemsLoader``) open,
+so slow loader writes are logged too.  Every read and write command is
+recorded under its *shape*: the command, the collection and the filter
+with every value replaced by ``"?"``, so ``{"user_id": 42}`` and
+``{"user_id": 7}`` are one entry and no customer data is kept.  In
+aggregation stages other than ``$match``, ``"$field"`` strings are
+kept as the field references they are; in filters they are values like
+any other.
+Commands slower than ``SLOW_QUERY_MS`` are logged and kept for
+``/data/queries``.
+
+Each shape also notes whether it uses ``$regex`` and which registered
+index (see ``indexes.py``) leads with one of its equality fields, so
+collection scans such as the product ``$regex`` search stand out next to
+their latency and the number of documents they return.
+"""
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from pymongo import monitoring
+
+from indexes import INDEXES
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+# Slow commands kept for /data/queries
+SLOW_QUERY_KEEP = 100
+# Distinct shapes tracked; commands of later new shapes are only counted as dropped
+MAX_SHAPES = 500
+# Open cursors remembered so getMore batches count towards their query's shape
+MAX_CURSORS = 1000
+
+# Command -> field holding its filter; insert has none
+FILTER_FIELDS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+    "aggregate": "pipeline",
+    "delete": "deletes",
+    "update": "updates",
+    "insert": None,
+}
+# Operators whose value is a list of plain values, shown as a single "?"
+VALUE_LIST_OPERATORS = {"$in", "$nin", "$all"}
+# Pipeline stages holding a query filter rather than aggregation expressions
+FILTER_STAGES = {"$match"}
+
+
+def redact(value, field_paths=False):
+    """Shape of a filter or pipeline: field names and operators kept, values replaced by "?".
+
+    With ``field_paths`` (aggregation expressions) strings starting with
+    ``$`` are kept as field references; ``$match`` stages inside are
+    redacted as filters.
+    """
+    if isinstance(value, dict):
+        return {
+            key: ["?"] if key in VALUE_LIST_OPERATORS else redact(item, field_paths and key not in FILTER_STAGES)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        # Branches of the same shape ($or over several terms) collapse into one
+        shapes = []
+        for item in value:
+            shape = redact(item, field_paths)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    if field_paths and isinstance(value, str) and value.startswith("$"):
+        return value
+    return "?"
+
+
+def command_filter(command_name, command):
+    """The part of a command that selects documents"""
+    field = FILTER_FIELDS.get(command_name)
+    if field is None:
+        return None
+    selector = command.get(field)
+    if command_name in ("delete", "update"):
+        return [statement.get("q") for statement in selector or []]
+    return selector
+
+
+def _equality_fields(filter_shape):
+    if isinstance(filter_shape, list):
+        # A pipeline: its leading $match is what can use an index
+        first = filter_shape[0] if filter_shape else {}
+        filter_shape = first.get("$match", {}) if isinstance(first, dict) else {}
+    if not isinstance(filter_shape, dict):
+        return set()
+    return {
+        field for field, condition in filter_shape.items()
+        if not field.startswith("$") and not (isinstance(condition, dict) and "$regex" in condition)
+    }
+
+
+def registered_index(collection_name, filter_shape):
+    """Name of a registered index whose leading key the filter matches by equality"""
+    fields = _equality_fields(filter_shape)
+    for index in INDEXES.get(collection_name, []):
+        document = index.document
+        leading_key = next(iter(document["key"]))
+        if leading_key in fields:
+            return document["name"]
+    return None
+
+
+def docs_returned(command_name, reply):
+    """Documents a read returned, or a write inserted, updated or deleted"""
+    cursor = reply.get("cursor")
+    if cursor is not None:
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if command_name == "distinct":
+        return len(reply.get("values", []))
+    if command_name == "findAndModify":
+        return 1 if reply.get("value") else 0
+    return reply.get("n", 0)
+
+
+class QueryMonitor(monitoring.CommandListener):
+    """Command listener aggregating latency by query shape.
+
+    pymongo calls listeners from whichever thread runs the command
+    (Motor's executor threads included), hence the lock.
+    """
+
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS, max_shapes=MAX_SHAPES):
+        self.slow_query_ms = slow_query_ms
+        self.max_shapes = max_shapes
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.cursors = OrderedDict()
+        self.shapes = {}
+        self.slow_queries = deque(maxlen=SLOW_QUERY_KEEP)
+        self.dropped = 0
+
+    def _shape_key(self, command_name, command):
+        if command_name == "getMore":
+            origin = self.cursors.get(command["getMore"])
+            return ("getMore", *origin[1:]) if origin else None
+        if command_name not in FILTER_FIELDS:
+            return None
+        collection_name = command.get(command_name)
+        shape = redact(command_filter(command_name, command) or {}, field_paths=command_name == "aggregate")
+        return (command_name, collection_name, json.dumps(shape, sort_keys=True, default=str))
+
+    def started(self, event):
+        try:
+            with self.lock:
+                key = self._shape_key(event.command_name, event.command)
+                if key is not None:
+                    cursor_id = event.command["getMore"] if event.command_name == "getMore" else None
+                    self.pending[(event.connection_id, event.request_id)] = (key, cursor_id)
+        except Exception as e:
+            logger.error(f"Error recording {event.command_name} command: {e}")
+
+    def succeeded(self, event):
+        try:
+            self._finish(event, event.reply)
+        except Exception as e:
+            logger.error(f"Error recording {event.command_name} command: {e}")
+
+    def failed(self, event):
+        try:
+            self._finish(event, None)
+        except Exception as e:
+            logger.error(f"Error recording {event.command_name} command: {e}")
+
+    def _finish(self, event, reply):
+        duration_ms = event.duration_micros / 1000
+        with self.lock:
+            pending = self.pending.pop((event.connection_id, event.request_id), None)
+            if pending is None:
+                return
+            key, cursor_id = pending
+            command_name, collection_name, shape = key
+            docs = docs_returned(command_name, reply) if reply else 0
+            self._track_cursor(key, cursor_id, reply)
+
+            entry = self.shapes.get(key)
+            if entry is None and len(self.shapes) < self.max_shapes:
+                shape_value = json.loads(shape)
+                entry = self.shapes[key] = {
+                    "command": command_name,
+                    "collection": collection_name,
+                    "shape": shape_value,
+                    "regex": '"$regex"' in shape,
+                    "registered_index": registered_index(collection_name, shape_value),
+                    "count": 0,
+                    "failures": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "docs_returned": 0,
+                }
+            if entry is None:
+                self.dropped += 1
+            else:
+                entry["count"] += 1
+                entry["total_ms"] += duration_ms
+                entry["max_ms"] = max(entry["max_ms"], duration_ms)
+                entry["docs_returned"] += docs
+                if reply is None:
+                    entry["failures"] += 1
+
+        if duration_ms >= self.slow_query_ms:
+            self._log_slow(command_name, collection_name, shape, duration_ms, docs)
+
+    def _track_cursor(self, key, getmore_cursor_id, reply):
+        """Remember open cursors by id; `getmore_cursor_id` is the cursor a getMore read from"""
+        if getmore_cursor_id is not None:
+            # Forgotten once exhausted (the server then returns id 0) or failed
+            if reply is None or not reply.get("cursor", {}).get("id"):
+                self.cursors.pop(getmore_cursor_id, None)
+            return
+        cursor = reply.get("cursor") if reply else None
+        if cursor and cursor.get("id"):
+            self.cursors[cursor["id"]] = key
+            while len(self.cursors) > MAX_CURSORS:
+                self.cursors.popitem(last=False)
+
+    def _log_slow(self, command_name, collection_name, shape, duration_ms, docs):
+        self.slow_queries.append({
+            "at": datetime.utcnow().isoformat(),
+            "command": command_name,
+            "collection": collection_name,
+            "shape": json.loads(shape),
+            "duration_ms": round(duration_ms, 3),
+            "docs_returned": docs,
+        })
+        logger.warning(f"🐢 Slow {command_name} on {collection_name}: {duration_ms:.1f}ms, {docs} docs, filter {shape}")
+
+    def report(self, limit=20):
+        """Shapes by total time spent, and the latest slow commands"""
+        with self.lock:
+            entries = [dict(entry) for entry in self.shapes.values()]
+            slow_queries = list(self.slow_queries)
+        entries.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        for entry in entries:
+            entry["avg_ms"] = round(entry["total_ms"] / entry["count"], 3)
+            entry["avg_docs_returned"] = round(entry["docs_returned"] / entry["count"], 1)
+            entry["total_ms"] = round(entry["total_ms"], 3)
+            entry["max_ms"] = round(entry["max_ms"], 3)
+        return {
+            "slow_query_ms": self.slow_query_ms,
+            "shapes": entries[:limit],
+            "tracked_shapes": len(entries),
+            "dropped_shapes": self.dropped,
+            "slow_queries": slow_queries[::-1],
+        }
+
+
+# Listener shared by every client of the process
+query_monitor = QueryMonitor()
@@ -0,0 +1,306 @@
+"""
+Storage-independent repositories for the API and the chatbot.
+
+``ChatbotService`` and the endpoints in ``main.py`` go through the
+repositories below instead of Motor collections.  Each repository is a
+thin layer over a ``Store``, which only has to provide a handful of
+document primitives.  Three stores exist:
+
+* ``mongo``  - Motor against MongoDB (the default)
+* ``memory`` - dicts with hash indexes, seeded from the CSV directory
+* ``sqlite`` - one table per collection with indexed key columns
+
+Select one with ``STORAGE_BACKEND``.  The memory and SQLite stores make
+it possible to run the service and its benchmarks without a network.
+"""
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from document_builder import build_documents
+from metrics import storage_operation_duration_seconds, storage_operation_errors_total
+from pagination import fetch_page
+from profiling import record_storage_wait
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo")
+DATA_DIRECTORY = os.getenv("DATA_DIRECTORY", "data")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "ecommerce_chatbot.db")
+
+# CSV file of each collection, as read by the loaders
+CSV_FILES = {
+    "distribution_centers": "distribution_centers.csv",
+    "products": "products.csv",
+    "users": "users.csv",
+    "orders": "orders.csv",
+    "inventory_items": "inventory_items.csv",
+    "order_items": "order_items.csv",
+}
+
+# Fields the non-Mongo stores keep an index on
+INDEXED_FIELDS = {
+    "distribution_centers": ["center_id"],
+    "products": ["product_id"],
+    "users": ["user_id"],
+    "orders": ["order_id", "user_id"],
+    "inventory_items": ["inventory_id", "product_id"],
+    "order_items": ["item_id", "order_id"],
+    "chat_messages": ["session_id"],
+}
+
+# Fields matched by the product text search fallback
+PRODUCT_SEARCH_FIELDS = ["name", "brand", "category", "department"]
+
+
+def project(document, projection):
+    """Copy of a document restricted to a MongoDB-style inclusion projection"""
+    if not projection:
+        return dict(document)
+    return {field: document[field] for field in ("_id", *projection) if field in document}
+
+
+class Store(ABC):
+    """Document primitives every storage backend implements.
+
+    ``equals`` is a dict of field -> value equality conditions.  ``find``
+    returns documents newest first on ``(sort_field, _id)`` when
+    ``sort_field`` is given, starting strictly after the ``(sort value,
+    _id)`` pair ``after``.
+    """
+    name = None
+    # MongoDB database, for the features only MongoDB has (index reports, reload watch)
+    database = None
+
+    async def connect(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def find_one(self, collection_name, equals, projection=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def find(self, collection_name, equals, projection=None, sort_field=None, limit=None, after=None):
+        raise NotImplementedError
+
+    async def iter_find(self, collection_name, equals, projection=None, sort_field=None, limit=None):
+        """Documents as the backend produces them (a cursor for MongoDB)"""
+        for document in await self.find(collection_name, equals, projection, sort_field=sort_field, limit=limit):
+            yield document
+
+    @abstractmethod
+    async def insert_many(self, collection_name, documents):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count(self, collection_name, exact=False):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def text_search(self, collection_name, fields, terms, limit, projection=None):
+        """Documents where any field contains any term, case-insensitively"""
+        raise NotImplementedError
+
+    async def ensure_indexes(self):
+        pass
+
+
+class InstrumentedStore:
+    """Store wrapper recording the latency and errors of each document call.
+
+    Everything other than the document primitives (``name``, ``database``,
+    ``ensure_indexes``, ``close``...) is passed through untouched.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getattr__(self, attribute):
+        return getattr(self.store, attribute)
+
+    async def _timed(self, operation, collection_name, call):
+        start = time.perf_counter()
+        try:
+            return await call
+        except Exception:
+            storage_operation_errors_total.labels(self.store.name, collection_name, operation).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            storage_operation_duration_seconds.labels(self.store.name, collection_name, operation).observe(elapsed)
+            record_storage_wait(elapsed)
+
+    async def find_one(self, collection_name, equals, projection=None):
+        return await self._timed("find_one", collection_name, self.store.find_one(collection_name, equals, projection))
+
+    async def find(self, collection_name, equals, projection=None, sort_field=None, limit=None, after=None):
+        call = self.store.find(collection_name, equals, projection, sort_field=sort_field, limit=limit, after=after)
+        return await self._timed("find", collection_name, call)
+
+    async def iter_find(self, collection_name, equals, projection=None, sort_field=None, limit=None):
+        # Only the time spent waiting on the store, not the consumer's time between documents
+        documents = self.store.iter_find(collection_name, equals, projection, sort_field=sort_field, limit=limit)
+        labels = (self.store.name, collection_name, "iter_find")
+        waited = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    document = await documents.__anext__()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    waited += time.perf_counter() - start
+                yield document
+        except Exception:
+            storage_operation_errors_total.labels(*labels).inc()
+            raise
+        finally:
+            await documents.aclose()
+            storage_operation_duration_seconds.labels(*labels).observe(waited)
+            record_storage_wait(waited)
+
+    async def insert_many(self, collection_name, documents):
+        return await self._timed("insert_many", collection_name, self.store.insert_many(collection_name, documents))
+
+    async def count(self, collection_name, exact=False):
+        return await self._timed("count", collection_name, self.store.count(collection_name, exact))
+
+    async def text_search(self, collection_name, fields, terms, limit, projection=None):
+        call = self.store.text_search(collection_name, fields, terms, limit, projection)
+        return await self._timed("text_search", collection_name, call)
+
+
+class OrderRepository:
+    def __init__(self, store):
+        self.store = store
+
+    async def get(self, order_id, projection=None):
+        return await self.store.find_one("orders", {"order_id": order_id}, projection)
+
+    async def recent_for_user(self, user_id, limit=5, projection=None):
+        return await self.store.find("orders", {"user_id": user_id}, projection, sort_field="created_at", limit=limit)
+
+    def iter_recent_for_user(self, user_id, limit=5, projection=None):
+        return self.store.iter_find("orders", {"user_id": user_id}, projection, sort_field="created_at", limit=limit)
+
+    async def page_for_user(self, user_id, cursor=None, limit=10, projection=None):
+        return await fetch_page(self.store, "orders", {"user_id": user_id}, "created_at", cursor, limit, projection)
+
+
+class ProductRepository:
+    def __init__(self, store):
+        self.store = store
+
+    async def get(self, product_id, projection=None):
+        return await self.store.find_one("products", {"product_id": product_id}, projection)
+
+    async def all(self, projection=None):
+        return await self.store.find("products", {}, projection)
+
+    async def search(self, terms, limit=10, projection=None):
+        return await self.store.text_search("products", PRODUCT_SEARCH_FIELDS, terms, limit, projection)
+
+
+class UserRepository:
+    def __init__(self, store):
+        self.store = store
+
+    async def get(self, user_id, projection=None):
+        return await self.store.find_one("users", {"user_id": user_id}, projection)
+
+
+class InventoryRepository:
+    def __init__(self, store):
+        self.store = store
+
+    async def get(self, inventory_id, projection=None):
+        return await self.store.find_one("inventory_items", {"inventory_id": inventory_id}, projection)
+
+    async def sample(self, limit=5, projection=None):
+        return await self.store.find("inventory_items", {}, projection, limit=limit)
+
+
+class ChatHistoryRepository:
+    def __init__(self, store):
+        self.store = store
+
+    async def insert_many(self, documents):
+        await self.store.insert_many("chat_messages", documents)
+
+    async def page_for_session(self, session_id, cursor=None, limit=10, projection=None):
+        return await fetch_page(self.store, "chat_messages", {"session_id": session_id}, "timestamp", cursor, limit, projection)
+
+
+class Repositories:
+    def __init__(self, store):
+        self.store = store
+        self.orders = OrderRepository(store)
+        self.products = ProductRepository(store)
+        self.users = UserRepository(store)
+        self.inventory = InventoryRepository(store)
+        self.chat_history = ChatHistoryRepository(store)
+
+    async def count(self, collection_name, exact=False):
+        return await self.store.count(collection_name, exact)
+
+
+async def load_csv_directory(store, csv_directory, chunk_size=50_000):
+    """Seed a store from the loaders' CSV files (missing files are skipped)"""
+    for collection_name, file_name in CSV_FILES.items():
+        file_path = os.path.join(csv_directory, file_name)
+        if not os.path.exists(file_path):
+            logger.warning(f"⚠️ {file_path} not found, {collection_name} left empty")
+            continue
+        total = 0
+        for chunk_df in pd.read_csv(file_path, chunksize=chunk_size):
+            documents = build_documents(chunk_df, collection_name)
+            await store.insert_many(collection_name, documents)
+            total += len(documents)
+        logger.info(f"✅ Loaded {total} {collection_name} into the {store.name} store")
+
+
+def create_store(backend=STORAGE_BACKEND):
+    """A store for a backend name"""
+    if backend == "mongo":
+        from storage_mongo import MongoStore
+        return MongoStore()
+    if backend == "memory":
+        from storage_memory import MemoryStore
+        return MemoryStore(csv_directory=DATA_DIRECTORY)
+    if backend == "sqlite":
+        from storage_sqlite import SQLiteStore
+        return SQLiteStore(SQLITE_PATH, csv_directory=DATA_DIRECTORY)
+    raise ValueError(f"Unknown storage backend {backend!r}, expected mongo, memory or sqlite")
+
+
+class Storage:
+    repositories: Repositories = None
+
+
+# Repositories used by the FastAPI app
+storage = Storage()
+
+
+async def connect_storage(store=None):
+    """Connect the configured store (or the one given) and build its repositories"""
+    store = store or create_store()
+    await store.connect()
+    storage.repositories = Repositories(InstrumentedStore(store))
+    logger.info(f"Storage backend: {store.name}")
+    return storage.repositories
+
+
+async def close_storage():
+    if storage.repositories:
+        await storage.repositories.store.close()
+
+
+def get_repositories():
+    return storage.repositories
@@ -0,0 +1,93 @@
+"""
+Per-session conversational context.
+
+Remembers, for each ``session_id``, the user the conversation is about
+and the last order, product, inventory item and user document the bot
+resolved, so "where is my order?" without a ``user_id`` and follow-ups
+like "more details about it" are answered without another database
+query.  Sessions idle for ``SESSION_IDLE_SECONDS`` are dropped, and the
+store never holds more than ``SESSION_MAX_ENTRIES`` sessions.
+"""
+import time
+from collections import OrderedDict
+
+SESSION_MAX_ENTRIES = 50_000
+SESSION_IDLE_SECONDS = 30 * 60
+
+
+def new_context(session_id):
+    return {
+        "session_id": session_id,
+        "user_id": None,
+        "entities": {},
+        "last_entity": None,
+        "last_seen": time.monotonic(),
+    }
+
+
+class SessionContextStore:
+    def __init__(self, max_entries=SESSION_MAX_ENTRIES, idle_seconds=SESSION_IDLE_SECONDS):
+        self.max_entries = max_entries
+        self.idle_seconds = idle_seconds
+        self.sessions = OrderedDict()
+        self.evictions = 0
+
+    def get(self, session_id):
+        """Context of a session, created on first use"""
+        now = time.monotonic()
+        context = self.sessions.get(session_id)
+        if context is None or now - context["last_seen"] > self.idle_seconds:
+            context = new_context(session_id)
+            self.sessions[session_id] = context
+        context["last_seen"] = now
+        self.sessions.move_to_end(session_id)
+        self._evict(now)
+        return context
+
+    def _evict(self, now):
+        # Least recently seen sessions are at the front
+        while self.sessions:
+            session_id, context = next(iter(self.sessions.items()))
+            if len(self.sessions) <= self.max_entries and now - context["last_seen"] <= self.idle_seconds:
+                break
+            del self.sessions[session_id]
+            self.evictions += 1
+
+    def resolve_user(self, context, user_id):
+        """The user_id to act on: the one given, else the one remembered"""
+        if user_id:
+            context["user_id"] = user_id
+        return context["user_id"]
+
+    def remember(self, context, entity, document):
+        """Record a resolved order, product, inventory item or user"""
+        if context is None or not document:
+            return
+        context["entities"][entity] = document
+        context["last_entity"] = entity
+        if entity == "user" and document.get("user_id"):
+            context["user_id"] = document["user_id"]
+
+    def recall(self, context, preferred=()):
+        """(entity, document) for the first preferred entity remembered, else the last one"""
+        if context is None:
+            return None
+        for entity in preferred:
+            if entity in context["entities"]:
+                return entity, context["entities"][entity]
+        entity = context["last_entity"]
+        if entity is None:
+            return None
+        return entity, context["entities"][entity]
+
+    def stats(self):
+        return {
+            "sessions": len(self.sessions),
+            "max_entries": self.max_entries,
+            "idle_seconds": self.idle_seconds,
+            "evictions": self.evictions,
+        }
+
+
+# Shared instance used by ChatbotService
+session_contexts = SessionContextStore()
@@ -0,0 +1,112 @@
+"""
+Zero-downtime full reloads through staging collections.
+
+A full reload writes into ``<collection>__staging`` while the live
+collection keeps serving reads.  Once the load finishes, the staging
+count is checked against the number of rows inserted, indexes are built
+on the staging collection, and ``renameCollection`` with ``dropTarget``
+atomically replaces the live collection.  Readers see either the old
+data or the new data, never a half-loaded collection.  Each swap is
+stamped in ``data_versions`` so the API can refresh what it caches.
+Loaders hold the staging collection in ``staged``/``staged_async``, so
+it is dropped when a load ends without swapping it in.
+"""
+import logging
+from contextlib import asynccontextmanager, contextmanager
+
+from data_events import mark_reloaded, mark_reloaded_async
+from indexes import index_models
+
+logger = logging.getLogger(__name__)
+
+STAGING_SUFFIX = "__staging"
+
+
+def staging_name(collection_name):
+    return f"{collection_name}{STAGING_SUFFIX}"
+
+
+def _check_count(collection_name, count, expected_count):
+    if count == 0 or count != expected_count:
+        logger.error(f"❌ Not swapping {collection_name}: staging has {count} documents, expected {expected_count}")
+        return False
+    return True
+
+
+def staging_collection(db, collection_name):
+    """Fresh staging collection to load into, replacing any leftover one.
+
+    The live collection keeps serving reads until ``swap_in`` renames
+    the staging collection over it.
+    """
+    staging = db[staging_name(collection_name)]
+    staging.drop()
+    return staging
+
+
+@contextmanager
+def staged(db, collection_name):
+    """Staging collection for a full reload, dropped on the way out unless swap_in renamed it"""
+    staging = staging_collection(db, collection_name)
+    try:
+        yield staging
+    finally:
+        # Nothing to drop once it was renamed over the live collection
+        staging.drop()
+
+
+def swap_in(db, collection_name, expected_count):
+    """Validate the staging collection, index it and rename it over the live one"""
+    staging = db[staging_name(collection_name)]
+    if not _check_count(collection_name, staging.count_documents({}), expected_count):
+        return False
+
+    try:
+        models = index_models(collection_name)
+        if models:
+            staging.create_indexes(models)
+        staging.rename(collection_name, dropTarget=True)
+        mark_reloaded(db, collection_name)
+    except Exception as e:
+        logger.error(f"❌ Failed to swap in {collection_name}: {e}")
+        return False
+
+    logger.info(f"🔁 Swapped {expected_count} documents into {collection_name}")
+    return True
+
+
+async def staging_collection_async(db, collection_name):
+    """Fresh staging collection to load into (see ``staging_collection``)"""
+    staging = db[staging_name(collection_name)]
+    await staging.drop()
+    return staging
+
+
+@asynccontextmanager
+async def staged_async(db, collection_name):
+    """Staging collection for a full reload (see ``staged``)"""
+    staging = await staging_collection_async(db, collection_name)
+    try:
+        yield staging
+    finally:
+        await staging.drop()
+
+
+async def swap_in_async(db, collection_name, expected_count):
+    """Validate the staging collection, index it and rename it over the live one"""
+    staging = db[staging_name(collection_name)]
+    if not _check_count(collection_name, await staging.count_documents({}), expected_count):
+        return False
+
+    try:
+        models = index_models(collection_name)
+        if models:
+            await staging.create_indexes(models)
+        await staging.rename(collection_name, dropTarget=True)
+        await mark_reloaded_async(db, collection_name)
+    except Exception as e:
+        logger.error(f"❌ Failed to swap in {collection_name}: {e}")
+        return False
+
+    logger.info(f"🔁 Swapped {expected_count} documents into {collection_name}")
+    return True
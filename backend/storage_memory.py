@@ -0,0 +1,85 @@
+"""
+In-memory store: every collection is a list of documents plus hash
+indexes on the fields in ``INDEXED_FIELDS``, so ID lookups and per-user
+or per-session listings never scan the collection.  Seeded from the CSV
+directory on connect; nothing is persisted.
+"""
+import heapq
+from collections import defaultdict
+
+from bson import ObjectId
+
+from repositories import INDEXED_FIELDS, Store, load_csv_directory, project
+
+
+class MemoryStore(Store):
+    name = "memory"
+
+    def __init__(self, csv_directory=None):
+        self.csv_directory = csv_directory
+        self.collections = defaultdict(list)
+        # collection -> field -> value -> documents
+        self.indexes = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+
+    async def connect(self):
+        if self.csv_directory and not self.collections:
+            await load_csv_directory(self, self.csv_directory)
+
+    def _candidates(self, collection_name, equals):
+        """Documents that can match ``equals``, narrowed by an index when one applies"""
+        for field in INDEXED_FIELDS.get(collection_name, []):
+            if field in equals:
+                return self.indexes[collection_name][field].get(equals[field], [])
+        return self.collections[collection_name]
+
+    def _matching(self, collection_name, equals):
+        return [
+            document for document in self._candidates(collection_name, equals)
+            if all(document.get(field) == value for field, value in equals.items())
+        ]
+
+    async def find_one(self, collection_name, equals, projection=None):
+        for document in self._matching(collection_name, equals):
+            return project(document, projection)
+        return None
+
+    async def find(self, collection_name, equals, projection=None, sort_field=None, limit=None, after=None):
+        documents = self._matching(collection_name, equals)
+        if sort_field:
+            if after:
+                documents = [d for d in documents if (d[sort_field], d["_id"]) < after]
+
+            def key(d):
+                return d[sort_field], d["_id"]
+
+            if limit:
+                documents = heapq.nlargest(limit, documents, key=key)
+            else:
+                documents = sorted(documents, key=key, reverse=True)
+        elif limit:
+            documents = documents[:limit]
+        return [project(document, projection) for document in documents]
+
+    async def insert_many(self, collection_name, documents):
+        collection = self.collections[collection_name]
+        indexes = self.indexes[collection_name]
+        for document in documents:
+            document = dict(document)
+            document.setdefault("_id", ObjectId())
+            collection.append(document)
+            for field in INDEXED_FIELDS.get(collection_name, []):
+                indexes[field][document.get(field)].append(document)
+
+    async def count(self, collection_name, exact=False):
+        return len(self.collections[collection_name])
+
+    async def text_search(self, collection_name, fields, terms, limit, projection=None):
+        terms = [term.lower() for term in terms]
+        results = []
+        for document in self.collections[collection_name]:
+            text = [str(document.get(field) or "").lower() for field in fields]
+            if any(term in value for term in terms for value in text):
+                results.append(project(document, projection))
+                if len(results) >= limit:
+                    break
+        return results
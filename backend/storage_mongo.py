@@ -0,0 +1,69 @@
+"""
+MongoDB store: the repositories' primitives on Motor collections.
+"""
+import re
+
+from pymongo.errors import BulkWriteError
+
+from database import close_mongo_connection, connect_to_mongo, get_database
+from indexes import ensure_indexes
+from pagination import keyset_filter
+from repositories import Store
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class MongoStore(Store):
+    name = "mongo"
+
+    async def connect(self):
+        await connect_to_mongo()
+        self.database = get_database()
+
+    async def close(self):
+        await close_mongo_connection()
+
+    async def find_one(self, collection_name, equals, projection=None):
+        return await self.database[collection_name].find_one(equals, projection)
+
+    def _cursor(self, collection_name, equals, projection, sort_field, limit, after=None):
+        cursor = self.database[collection_name].find(keyset_filter(equals, sort_field, after), projection)
+        if sort_field:
+            cursor = cursor.sort([(sort_field, -1), ("_id", -1)])
+        if limit:
+            cursor = cursor.limit(limit)
+        return cursor
+
+    async def find(self, collection_name, equals, projection=None, sort_field=None, limit=None, after=None):
+        cursor = self._cursor(collection_name, equals, projection, sort_field, limit, after)
+        return await cursor.to_list(length=limit)
+
+    async def iter_find(self, collection_name, equals, projection=None, sort_field=None, limit=None):
+        async for document in self._cursor(collection_name, equals, projection, sort_field, limit):
+            yield document
+
+    async def insert_many(self, collection_name, documents):
+        try:
+            await self.database[collection_name].insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Documents already written by an earlier attempt of the same batch
+            if any(error["code"] != DUPLICATE_KEY_ERROR for error in e.details["writeErrors"]):
+                raise
+
+    async def count(self, collection_name, exact=False):
+        if exact:
+            return await self.database[collection_name].count_documents({})
+        return await self.database[collection_name].estimated_document_count()
+
+    async def text_search(self, collection_name, fields, terms, limit, projection=None):
+        query = {
+            "$or": [
+                {field: {"$regex": re.escape(term), "$options": "i"}}
+                for term in terms
+                for field in fields
+            ]
+        }
+        return await self.database[collection_name].find(query, projection).limit(limit).to_list(length=limit)
+
+    async def ensure_indexes(self):
+        await ensure_indexes(self.database)
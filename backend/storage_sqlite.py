@@ -0,0 +1,164 @@
+"""
+SQLite store: one table per collection holding each document as
+Extended JSON, plus real columns (with indexes) for the fields the
+repositories filter and sort on.  Everything else is matched with
+``json_extract``.  Seeded from the CSV directory when the file is new.
+
+sqlite3 is blocking, so every statement runs in a worker thread, one at
+a time on a single connection.
+"""
+import asyncio
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from bson import ObjectId, json_util
+
+from repositories import INDEXED_FIELDS, Store, load_csv_directory, project
+
+# (filter field, time field) of each collection's newest-first listings
+LISTINGS = {
+    "orders": ("user_id", "created_at"),
+    "chat_messages": ("session_id", "timestamp"),
+}
+
+
+def _column_value(value):
+    """SQLite value of an indexed field; datetimes become fixed-width
+    UTC strings (millisecond precision, like BSON) that sort correctly"""
+    if isinstance(value, datetime):
+        if value.tzinfo:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat(timespec="milliseconds")
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+
+def _escape_like(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class SQLiteStore(Store):
+    name = "sqlite"
+
+    def __init__(self, path, csv_directory=None):
+        self.path = path
+        self.csv_directory = csv_directory
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def _columns(self, collection_name):
+        columns = list(INDEXED_FIELDS.get(collection_name, []))
+        if collection_name in LISTINGS:
+            columns.append(LISTINGS[collection_name][1])
+        return columns
+
+    def _execute(self, sql, parameters=(), many=False):
+        with self.lock:
+            if many:
+                self.connection.executemany(sql, parameters)
+                self.connection.commit()
+                return []
+            return self.connection.execute(sql, parameters).fetchall()
+
+    async def _run(self, sql, parameters=(), many=False):
+        return await asyncio.to_thread(self._execute, sql, parameters, many)
+
+    def _create_tables(self):
+        for collection_name in INDEXED_FIELDS:
+            columns = self._columns(collection_name)
+            column_sql = "".join(f", {column}" for column in columns)
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {collection_name} (_id TEXT PRIMARY KEY, doc TEXT NOT NULL{column_sql})"
+            )
+            for column in INDEXED_FIELDS[collection_name]:
+                index_columns = [column]
+                if collection_name in LISTINGS and LISTINGS[collection_name][0] == column:
+                    index_columns += [LISTINGS[collection_name][1], "_id"]
+                self.connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {collection_name}_{column} "
+                    f"ON {collection_name} ({', '.join(index_columns)})"
+                )
+        self.connection.commit()
+
+    async def connect(self):
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        await asyncio.to_thread(self._create_tables)
+        if self.csv_directory and not await self.count("products"):
+            await load_csv_directory(self, self.csv_directory)
+
+    async def close(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+    def _where(self, collection_name, equals):
+        columns = self._columns(collection_name)
+        clauses, parameters = [], []
+        for field, value in equals.items():
+            if field in columns:
+                clauses.append(f"{field} = ?")
+            else:
+                clauses.append(f"json_extract(doc, '$.{field}') = ?")
+            parameters.append(_column_value(value))
+        return clauses, parameters
+
+    @staticmethod
+    def _decode(rows, projection):
+        return [project(json_util.loads(row[0]), projection) for row in rows]
+
+    async def find_one(self, collection_name, equals, projection=None):
+        documents = await self.find(collection_name, equals, projection, limit=1)
+        return documents[0] if documents else None
+
+    async def find(self, collection_name, equals, projection=None, sort_field=None, limit=None, after=None):
+        clauses, parameters = self._where(collection_name, equals)
+        if sort_field:
+            if sort_field not in self._columns(collection_name):
+                raise ValueError(f"{collection_name} cannot be sorted on {sort_field}")
+            if after:
+                sort_value, document_id = after
+                clauses.append(f"({sort_field}, _id) < (?, ?)")
+                parameters += [_column_value(sort_value), str(document_id)]
+        sql = f"SELECT doc FROM {collection_name}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if sort_field:
+            sql += f" ORDER BY {sort_field} DESC, _id DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return self._decode(await self._run(sql, parameters), projection)
+
+    async def insert_many(self, collection_name, documents):
+        columns = self._columns(collection_name)
+        rows = []
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+            rows.append((
+                str(document["_id"]),
+                json_util.dumps(document),
+                *(_column_value(document.get(column)) for column in columns),
+            ))
+        placeholders = ", ".join("?" * (len(columns) + 2))
+        column_sql = ", ".join(["_id", "doc", *columns])
+        await self._run(
+            f"INSERT OR IGNORE INTO {collection_name} ({column_sql}) VALUES ({placeholders})",
+            rows, many=True,
+        )
+
+    async def count(self, collection_name, exact=False):
+        rows = await self._run(f"SELECT COUNT(*) FROM {collection_name}")
+        return rows[0][0]
+
+    async def text_search(self, collection_name, fields, terms, limit, projection=None):
+        clauses, parameters = [], []
+        for term in terms:
+            for field in fields:
+                clauses.append(f"json_extract(doc, '$.{field}') LIKE ? ESCAPE '\\'")
+                parameters.append(f"%{_escape_like(term)}%")
+        if not clauses:
+            return []
+        sql = f"SELECT doc FROM {collection_name} WHERE {' OR '.join(clauses)} LIMIT {int(limit)}"
+        return self._decode(await self._run(sql, parameters), projection)